@@ -0,0 +1,196 @@
+"""
+Runs MainSpider end to end, with the real Playwright download handler, against the
+local stand-in TCGPlayer server in tcgplayer_server.py, once per settings
+configuration, and reports for each one:
+
+  * cards scraped and cards per minute,
+  * p50/p95 latency of the rendered pages (download_latency),
+  * peak RSS of Scrapy and the Playwright processes,
+  * CPU time of Scrapy and the Playwright processes.
+
+Every crawl runs in a fresh process, with its own export directory and set
+catalog, and with the card index and the set selector window turned off.
+
+Usage:
+    python benchmarks/crawl_throughput.py --sets 2 --cards 60 --render-delay 200 \\
+        --config baseline: \\
+        --config pages4:PLAYWRIGHT_MAX_PAGES_PER_CONTEXT=4 \\
+        --config chromium:PLAYWRIGHT_BROWSER_TYPE=chromium,PLAYWRIGHT_LAUNCH_OPTIONS={}
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import tcgplayer_server  # noqa: E402
+
+
+def parse_config(value: str) -> tuple:
+    """NAME:SETTING=VALUE,SETTING=VALUE into (name, overrides). JSON values are decoded."""
+    name, _, assignments = value.partition(":")
+    overrides = {}
+    for assignment in filter(None, assignments.split(",")):
+        setting, _, setting_value = assignment.partition("=")
+        try:
+            overrides[setting] = json.loads(setting_value)
+        except ValueError:
+            overrides[setting] = setting_value
+    return name or "baseline", overrides
+
+
+def percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def get_cpu_seconds() -> float:
+    """CPU time of this process and of its exited descendants (the Playwright driver
+    and browsers, once the crawl has finished)."""
+    try:
+        import resource
+    except ImportError:  # Windows, only this process is counted
+        import psutil
+
+        times = psutil.Process().cpu_times()
+        return times.user + times.system
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+
+def run_crawl(search_url, set_names, overrides, result_queue) -> None:
+    """Target of each benchmark process."""
+    os.chdir(ROOT)
+    os.environ.setdefault("SCRAPY_SETTINGS_MODULE", "pokespider.settings")
+
+    from scrapy import signals
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+
+    work_dir = tempfile.mkdtemp(prefix="pokespider-bench-")
+    settings = get_project_settings()
+    settings.setdict(
+        {
+            "SEARCH_URL": search_url,
+            "USE_SET_SELECTION_WINDOW": False,
+            "DEFAULT_SET_LIST": set_names,
+            "SET_LIST_FILE": None,
+            "SET_CATALOG_PATH": os.path.join(work_dir, "set_catalog.json"),
+            "EXPORT_PATH_BASE": work_dir + "/",
+            "CARD_INDEX_ENABLED": False,
+            "PLAYWRIGHT_ARCHIVE_MODE": None,
+            "PLAYWRIGHT_SUBRESOURCE_CACHE_DIR": None,
+            "PLAYWRIGHT_MEMORY_SAMPLER_ENABLED": True,
+            "PLAYWRIGHT_MEMORY_SAMPLER_INTERVAL": 1,
+            "PLAYWRIGHT_MEMORY_SAMPLER_CSV": None,
+            "LOG_LEVEL": "WARNING",
+        },
+        priority="cmdline",
+    )
+    settings.setdict(overrides, priority="cmdline")
+
+    latencies = []
+
+    def response_received(response, request, spider):
+        if "download_latency" in request.meta:
+            latencies.append(request.meta["download_latency"])
+
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler("main")
+    crawler.signals.connect(response_received, signal=signals.response_received)
+    process.crawl(crawler)
+    start = time.perf_counter()
+    process.start()
+    elapsed = time.perf_counter() - start
+
+    stats = crawler.stats.get_stats()
+    result_queue.put(
+        {
+            "cards": stats.get("item_scraped_count", 0),
+            "elapsed": elapsed,
+            "pages": len(latencies),
+            "p50": percentile(latencies, 0.5),
+            "p95": percentile(latencies, 0.95),
+            "peak_rss": stats.get("memory_sampler/total/max", 0),
+            "cpu": get_cpu_seconds(),
+            "errors": stats.get("log_count/ERROR", 0),
+        }
+    )
+
+
+def main(args) -> None:
+    catalogue = tcgplayer_server.make_catalogue(args.sets, args.cards, args.seed)
+    server = tcgplayer_server.make_server(catalogue, args.render_delay)
+    search_url = tcgplayer_server.search_url(server)
+    configs = [parse_config(value) for value in args.config or ["baseline:"]]
+
+    mp_context = multiprocessing.get_context("spawn")
+    results = {}
+    for name, overrides in configs:
+        for round_index in range(args.rounds):
+            result_queue = mp_context.Queue()
+            worker = mp_context.Process(
+                target=run_crawl, args=(search_url, list(catalogue), overrides, result_queue)
+            )
+            worker.start()
+            try:
+                result = result_queue.get(timeout=args.timeout)
+            except queue.Empty:
+                worker.terminate()
+                print(f"{name}: round {round_index + 1} timed out", file=sys.stderr)
+                continue
+            worker.join()
+            results.setdefault(name, []).append(result)
+    server.shutdown()
+
+    expected = args.sets * args.cards
+    print(
+        f"sets={args.sets} cards/set={args.cards} render_delay={args.render_delay}ms"
+        f" rounds={args.rounds}"
+    )
+    print(
+        f"{'config':<20} {'cards':>11} {'cards/min':>10} {'p50 ms':>8} {'p95 ms':>8}"
+        f" {'peak MiB':>9} {'CPU s':>8} {'errors':>7}"
+    )
+    summary = {}
+    for name, runs in results.items():
+        row = {
+            key: statistics.median(run[key] for run in runs)
+            for key in ("cards", "elapsed", "p50", "p95", "peak_rss", "cpu", "errors")
+        }
+        row["cards_per_minute"] = row["cards"] / row["elapsed"] * 60 if row["elapsed"] else 0
+        summary[name] = row
+        print(
+            f"{name:<20} {int(row['cards']):>5}/{expected:<5} {row['cards_per_minute']:>10.1f}"
+            f" {row['p50'] * 1000:>8.0f} {row['p95'] * 1000:>8.0f}"
+            f" {row['peak_rss'] / 1024**2:>9.0f} {row['cpu']:>8.1f} {int(row['errors']):>7}"
+        )
+    if args.json:
+        Path(args.json).write_text(json.dumps(summary, indent=4))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    tcgplayer_server.add_arguments(parser)
+    parser.add_argument("--config", action="append", metavar="NAME:SETTING=VALUE,...",
+                        help="A settings configuration to benchmark. Can be repeated.")
+    parser.add_argument("--rounds", type=int, default=1,
+                        help="Crawls per configuration, the median is reported.")
+    parser.add_argument("--timeout", type=float, default=3600,
+                        help="Seconds before a crawl is given up on.")
+    parser.add_argument("--json", help="Also write the results to this file.")
+    main(parser.parse_args())
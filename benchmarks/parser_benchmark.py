@@ -0,0 +1,257 @@
+"""
+Measures the MainSpider callbacks that parse rendered pages, without a browser.
+
+HTML fixtures are fed straight into the callbacks as HtmlResponse objects, and the
+time and peak memory allocated per page are reported for each callback and
+compared against a stored baseline. A fresh response is built for every call, so
+that the parsed document is never reused between calls.
+
+Fixtures are generated from the synthetic catalogue of tcgplayer_server.py, padded
+to a realistic page size, unless --fixtures points at a directory of saved pages
+named search*.html, first_details*.html and last_details*.html (first details
+pages should be saved on their first listings page, last details pages on their
+last one).
+
+The timings depend on the machine and Python version they were taken on, so no
+baseline is committed. Store one with --save-baseline on your own machine before
+making a change (it is written to benchmarks/parser_baseline.json, which git
+ignores), then run again without it to compare. Without a baseline the timings
+are only printed.
+
+Usage:
+    python benchmarks/parser_benchmark.py --save-baseline
+    python benchmarks/parser_benchmark.py --max-regression 0.15
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import tcgplayer_server  # noqa: E402
+from parsel import Selector  # noqa: E402
+from scrapy import Request  # noqa: E402
+from scrapy.http import HtmlResponse, TextResponse  # noqa: E402
+from scrapy.utils.test import get_crawler  # noqa: E402
+
+from pokespider.details_page import DETAILS_PAGE_SELECTORS  # noqa: E402
+from pokespider.items import PokespiderItem  # noqa: E402
+from pokespider.parse_pool import parse_page  # noqa: E402
+from pokespider.spiders.main_spider import MainSpider  # noqa: E402
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "parser_baseline.json"
+BASE_URL = "https://www.tcgplayer.com"
+
+
+def generate_fixtures(padding_kb: int) -> Dict[str, List[str]]:
+    catalogue = tcgplayer_server.make_catalogue(1, 48)
+    cards = next(iter(catalogue.values()))
+    query = {"productLineName": "pokemon", "setName": "sb01", "view": "grid"}
+    fixtures = {"search": [], "first_details": [], "last_details": []}
+    for page in (1, 2):
+        content = tcgplayer_server.search_content(cards, query, page, 24)
+        fixtures["search"].append(tcgplayer_server.rendered_html("Search", content, padding_kb))
+    for card in cards[:8]:
+        last_page = -(-len(card.listing_prices) // tcgplayer_server.LISTINGS_PER_PAGE)
+        for kind, page in (("first_details", 1), ("last_details", last_page)):
+            content = tcgplayer_server.details_content(card, page)
+            fixtures[kind].append(tcgplayer_server.rendered_html(card.name, content, padding_kb))
+    return fixtures
+
+
+def load_fixtures(directory: Path) -> Dict[str, List[str]]:
+    fixtures = {}
+    for kind in ("search", "first_details", "last_details"):
+        paths = sorted(directory.glob(f"{kind}*.html"))
+        fixtures[kind] = [path.read_text(encoding="utf-8") for path in paths]
+        if not fixtures[kind]:
+            raise SystemExit(f"No {kind}*.html fixtures in {directory}")
+    return fixtures
+
+
+def make_spider() -> MainSpider:
+    crawler = get_crawler(
+        MainSpider,
+        {
+            "CARD_INDEX_ENABLED": False,
+            "LATENCY_HISTOGRAMS_ENABLED": False,
+            "MAX_WIP_CARDS": 0,
+            "SEARCH_PAGE_FAN_OUT": False,
+            "LOG_LEVEL": "WARNING",
+        },
+    )
+    return MainSpider.from_crawler(crawler)
+
+
+def wip_item() -> PokespiderItem:
+    return PokespiderItem(first_url=f"{BASE_URL}/product/1/card", card_series="SB01 - Bench")
+
+
+def html_response(body: str, meta: dict) -> HtmlResponse:
+    url = f"{BASE_URL}/product/1/card"
+    return HtmlResponse(
+        url=url, body=body.encode("utf-8"), encoding="utf-8", request=Request(url, meta=meta)
+    )
+
+
+def make_cases(spider: MainSpider, fixtures: Dict[str, List[str]]) -> Dict[str, tuple]:
+    """Callback name -> (fixtures, function parsing one fixture)."""
+    search_meta = {"card_set": "SB01: Bench", "search_page_number": 2, "search_fanned_out": True}
+    # what EXTRACT_IN_BROWSER sends back instead of the page
+    extracted = [
+        json.dumps(
+            {
+                field: Selector(text=page).css(selector).getall()
+                for field, selector in DETAILS_PAGE_SELECTORS.items()
+            }
+        )
+        for page in fixtures["first_details"]
+    ]
+
+    def parse_search_page(page: str) -> None:
+        list(spider.parse_search_page(html_response(page, dict(search_meta))))
+
+    def get_search_page_fields(page: str) -> None:
+        spider.get_search_page_fields(html_response(page, dict(search_meta)))
+
+    def parse_page_in_worker(kind: str) -> Callable:
+        # the work a parse pool worker does, less the transfer to and from it
+        return lambda page: parse_page(kind, page)
+
+    def parse_first_details_page(page: str) -> None:
+        list(spider.parse_first_details_page(html_response(page, {"wip_item": wip_item()})))
+
+    def parse_first_details_page_single_visit(page: str) -> None:
+        meta = {"wip_item": wip_item(), "high_price_in_page": True}
+        list(spider.parse_first_details_page(html_response(page, meta)))
+
+    def parse_first_details_page_extract(body: str) -> None:
+        url = f"{BASE_URL}/product/1/card"
+        meta = {"wip_item": wip_item(), "playwright_extract": True}
+        response = TextResponse(
+            url=url, body=body.encode("utf-8"), encoding="utf-8", request=Request(url, meta=meta)
+        )
+        list(spider.parse_first_details_page(response))
+
+    def parse_last_details_page(page: str) -> None:
+        list(spider.parse_last_details_page(html_response(page, {"wip_item": wip_item()})))
+
+    return {
+        "parse_search_page": (fixtures["search"], parse_search_page),
+        "get_search_page_fields": (fixtures["search"], get_search_page_fields),
+        "parse_first_details_page": (fixtures["first_details"], parse_first_details_page),
+        # single-visit mode parses the page after it was moved to its last listings
+        "parse_first_details_page[single_visit]": (
+            fixtures["last_details"],
+            parse_first_details_page_single_visit,
+        ),
+        "parse_first_details_page[extract]": (extracted, parse_first_details_page_extract),
+        "parse_last_details_page": (fixtures["last_details"], parse_last_details_page),
+        "parse_page[search]": (fixtures["search"], parse_page_in_worker("search")),
+        "parse_page[first_details]": (
+            fixtures["first_details"],
+            parse_page_in_worker("first_details"),
+        ),
+    }
+
+
+def measure(pages: list, parse: Callable, iterations: int, repeat: int) -> dict:
+    for page in pages:  # warm up
+        parse(page)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for page in pages:
+                parse(page)
+        timings.append((time.perf_counter() - start) / (iterations * len(pages)))
+
+    peaks = []
+    tracemalloc.start()
+    for page in pages:
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        parse(page)
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    tracemalloc.stop()
+
+    return {
+        "us_per_page": min(timings) * 1e6,
+        "peak_kib_per_page": statistics.mean(peaks) / 1024,
+    }
+
+
+def main(args) -> int:
+    if args.fixtures:
+        fixtures = load_fixtures(Path(args.fixtures))
+    else:
+        fixtures = generate_fixtures(args.padding_kb)
+    print(
+        "fixture sizes: "
+        + ", ".join(
+            f"{kind} {statistics.mean(len(page) for page in pages) / 1024:.0f} KiB"
+            for kind, pages in fixtures.items()
+        )
+    )
+
+    spider = make_spider()
+    results = {
+        name: measure(pages, parse, args.iterations, args.repeat)
+        for name, (pages, parse) in make_cases(spider, fixtures).items()
+    }
+
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+    regressions = []
+    print(f"{'callback':<42} {'us/page':>10} {'peak KiB/page':>14} {'vs baseline':>12}")
+    for name, result in results.items():
+        comparison = ""
+        if name in baseline:
+            ratio = result["us_per_page"] / baseline[name]["us_per_page"]
+            comparison = f"{ratio - 1:+.1%}"
+            if ratio - 1 > args.max_regression:
+                regressions.append(name)
+                comparison += " !"
+        print(
+            f"{name:<42} {result['us_per_page']:>10.1f} {result['peak_kib_per_page']:>14.1f}"
+            f" {comparison:>12}"
+        )
+
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(results, indent=4))
+        print(f"Baseline written to {baseline_path}")
+    elif not baseline:
+        print(
+            f"No baseline at {baseline_path}, nothing to compare against. Run with"
+            " --save-baseline before making a change to store one for this machine."
+        )
+
+    if regressions:
+        print(
+            f"Slower than the baseline by more than {args.max_regression:.0%}:"
+            f" {', '.join(regressions)}"
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--fixtures",
+                        help="Directory of saved pages to use instead of generated ones.")
+    parser.add_argument("--padding-kb", type=int, default=256,
+                        help="Size of the markup added around generated fixtures.")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5, help="The fastest repeat is reported.")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--max-regression", type=float, default=0.15,
+                        help="Fail when a callback is this much slower than the baseline.")
+    raise SystemExit(main(parser.parse_args()))
@@ -0,0 +1,113 @@
+"""
+Measures the overhead that intercepting subrequests with page.route adds to each
+subrequest of a page, for the route modes of PLAYWRIGHT_ROUTE_FILTER.
+
+A local HTTP server serves a page that loads N small subresources. The page is
+loaded repeatedly with:
+
+  * no route at all (baseline),
+  * route("**") with the same work the download handler does per subrequest
+    (all_headers() through use_scrapy_headers, then route.continue_),
+  * a route for the navigation request only (PLAYWRIGHT_ROUTE_FILTER = "navigation",
+    which needs PLAYWRIGHT_PROCESS_REQUEST_HEADERS = None to take effect).
+
+Usage:
+    python benchmarks/route_overhead.py --subrequests 100 --rounds 20 --browser firefox
+"""
+import argparse
+import asyncio
+import re
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from playwright.async_api import async_playwright  # noqa: E402
+from scrapy.http.headers import Headers  # noqa: E402
+
+from scrapy_playwright.headers import use_scrapy_headers  # noqa: E402
+
+
+def make_server(subrequest_count: int) -> ThreadingHTTPServer:
+    page = "<html><head>{}</head><body><div id='done'>done</div></body></html>".format(
+        "".join(f"<script src='/asset/{index}.js'></script>" for index in range(subrequest_count))
+    ).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith("/asset/"):
+                body, content_type = b"// asset", "application/javascript"
+            else:
+                body, content_type = page, "text/html"
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def load_times(browser, browser_type: str, url: str, mode: str, rounds: int) -> list:
+    scrapy_headers = Headers({"User-Agent": "route-overhead-benchmark"})
+
+    async def handler(route, request):
+        headers = await use_scrapy_headers(browser_type, request, scrapy_headers)
+        await route.continue_(headers=headers)
+
+    context = await browser.new_context()
+    times = []
+    for _ in range(rounds):
+        page = await context.new_page()
+        if mode == "all":
+            await page.route("**", handler)
+        elif mode == "navigation":
+            await page.route(re.compile("^" + re.escape(url.rstrip("/")) + "/?$"), handler)
+        start = time.perf_counter()
+        await page.goto(url, wait_until="load")
+        times.append(time.perf_counter() - start)
+        await page.close()
+    await context.close()
+    return times
+
+
+async def main(args) -> None:
+    server = make_server(args.subrequests)
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    async with async_playwright() as playwright:
+        browser = await getattr(playwright, args.browser).launch(headless=True)
+        # warm up the browser and the server
+        await load_times(browser, args.browser, url, "none", 2)
+        results = {}
+        for mode in ("none", "all", "navigation"):
+            results[mode] = statistics.median(
+                await load_times(browser, args.browser, url, mode, args.rounds)
+            )
+        await browser.close()
+    server.shutdown()
+
+    print(f"browser={args.browser} subrequests={args.subrequests} rounds={args.rounds}")
+    for mode, median in results.items():
+        overhead = (median - results["none"]) / args.subrequests * 1000
+        print(
+            f"route={mode:<10} median page load {median * 1000:8.1f} ms"
+            f"   overhead per subrequest {overhead:6.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--subrequests", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--browser", default="firefox", choices=["chromium", "firefox", "webkit"])
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,284 @@
+"""
+Local stand-in for the parts of TCGPlayer.com that MainSpider crawls, serving a
+synthetic catalogue of N sets x M cards:
+
+  * the search page, with the set filter (the set selector) when no set is given,
+  * paginated search grids for a set (setName, page and pageSize parameters),
+  * card details pages with price points and paginated listings (page parameter).
+
+Like the real site, the content of every page is rendered by JavaScript after the
+page loads, optionally after a render delay, so the spider's selector waits and
+page methods do real work.
+
+Usage:
+    python benchmarks/tcgplayer_server.py --sets 4 --cards 120 --render-delay 200 --port 8000
+
+Then crawl it by pointing the SEARCH_URL setting at the printed URL.
+"""
+import argparse
+import html
+import json
+import random
+import threading
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import parse_qs, urlparse
+
+SEARCH_PATH = "/search/pokemon/product"
+DEFAULT_PAGE_SIZE = 24
+LISTINGS_PER_PAGE = 10
+RARITIES = ["Common", "Uncommon", "Rare", "Double Rare", "Illustration Rare"]
+PRICE_POINTS = [("Market Price:", 1.0), ("Most Recent Sale:", 0.97), ("Listed Median:", 1.1)]
+FOIL_FACTOR = {"Normal": 1.0, "Foil": 1.8}
+
+
+@dataclass
+class Card:
+    product_id: int
+    number: int
+    name: str
+    set_name: str
+    rarity: str
+    variants: List[str]
+    low_price: float
+    market_price: float
+    listing_prices: List[float]
+
+    @property
+    def path(self) -> str:
+        return f"/product/{self.product_id}/pokemon-{slugify(self.set_name)}-{slugify(self.name)}"
+
+
+def slugify(text: str) -> str:
+    return "".join(c if c.isalnum() else "-" for c in text.lower()).strip("-")
+
+
+def make_catalogue(set_count: int, card_count: int, seed: int = 0) -> Dict[str, List[Card]]:
+    """Cards of each set, keyed by set name. The same arguments give the same catalogue."""
+    rng = random.Random(seed)
+    catalogue = {}
+    product_id = 100000
+    for set_index in range(set_count):
+        set_name = f"SB{set_index + 1:02d}: Synthetic Bench Set {set_index + 1}"
+        cards = []
+        for number in range(1, card_count + 1):
+            product_id += 1
+            market_price = round(rng.lognormvariate(0, 1.2), 2)
+            listing_count = rng.randint(1, 60)
+            listing_prices = sorted(
+                round(market_price * rng.uniform(0.8, 3.0), 2) for _ in range(listing_count)
+            )
+            cards.append(
+                Card(
+                    product_id=product_id,
+                    number=number,
+                    name=f"Benchmon {set_index + 1}-{number}",
+                    set_name=set_name,
+                    rarity=rng.choice(RARITIES),
+                    variants=rng.choice([["Normal"], ["Foil"], ["Normal", "Foil"]]),
+                    low_price=listing_prices[0],
+                    market_price=market_price,
+                    listing_prices=listing_prices,
+                )
+            )
+        catalogue[set_name] = cards
+    return catalogue
+
+
+def render_page(title: str, content: str, render_delay: int) -> bytes:
+    """A page whose content is only added to the DOM by script, after render_delay ms."""
+    return f"""<!DOCTYPE html>
+<html><head><title>{html.escape(title)}</title></head>
+<body><div id="app"></div>
+<template id="content">{content}</template>
+<script>
+setTimeout(() => {{
+    // move the content out of the template, so it isn't serialised twice
+    const template = document.getElementById("content");
+    document.getElementById("app").appendChild(template.content.cloneNode(true));
+    template.remove();
+}}, {render_delay});
+</script>
+</body></html>""".encode("utf-8")
+
+
+def rendered_html(title: str, content: str, padding_kb: int = 0) -> str:
+    """The page as page.content() returns it once rendered, with padding_kb of
+    navigation-like markup around the content to bring it closer to the size of
+    a real page."""
+    padding = []
+    size = 0
+    index = 0
+    while size < padding_kb * 1024:
+        block = (
+            f'<li class="nav-menu__item"><a class="nav-menu__link" href="/categories/{index}">'
+            f'<span class="nav-menu__label">Category {index}</span></a></li>'
+        )
+        padding.append(block)
+        size += len(block)
+        index += 1
+    return (
+        f"<!DOCTYPE html><html><head><title>{html.escape(title)}</title></head><body>"
+        f'<nav class="nav-menu"><ul>{"".join(padding[: len(padding) // 2])}</ul></nav>'
+        f'<div id="app">{content}</div>'
+        f'<footer class="footer"><ul>{"".join(padding[len(padding) // 2:])}</ul></footer>'
+        f"</body></html>"
+    )
+
+
+def money(price: float) -> str:
+    return f"${price:,.2f}"
+
+
+def set_selector_content(catalogue: Dict[str, List[Card]]) -> str:
+    checkboxes = "".join(
+        f'<div class="tcg-input-checkbox"><input type="checkbox" value="{slugify(set_name)}">'
+        f'<span class="tcg-input-checkbox__label-text">{html.escape(set_name)}</span></div>'
+        for set_name in catalogue
+    )
+    return (
+        f'<div data-testid="searchFilterSet">{checkboxes}</div><div class="search-results"></div>'
+    )
+
+
+def pagination(base_url: str, page: int, page_count: int, next_button: bool) -> str:
+    links = "".join(
+        f'<a href="{html.escape(base_url)}page={number}">{number}</a>'
+        for number in range(1, page_count + 1)
+    )
+    next_link = ""
+    if next_button and page < page_count:
+        next_url = html.escape(f"{base_url}page={page + 1}")
+        next_link = f'<a aria-label="Next page" href="{next_url}">&gt;</a>'
+    return (
+        f'<div class="tcg-pagination"><div class="tcg-pagination__pages">{links}</div>'
+        f"{next_link}</div>"
+    )
+
+
+def search_content(cards: List[Card], query: Dict[str, str], page: int, page_size: int) -> str:
+    page_count = max(1, -(-len(cards) // page_size))
+    results = []
+    for card in cards[(page - 1) * page_size:page * page_size]:
+        results.append(
+            f'<div class="search-result"><a href="{card.path}">'
+            f'<span class="product-card__subtitle">{html.escape(card.set_name)}</span>'
+            f'<section class="product-card__rarity"><span>{card.rarity}</span><span>&middot;</span>'
+            f"<span>#{card.number:03d}/{len(cards):03d}</span></section>"
+            f'<span class="product-card__title">{html.escape(card.name)} - {card.number:03d}</span>'
+            f'<span class="inventory__price-with-shipping">{money(card.low_price)}</span>'
+            f'<span class="product-card__market-price--value">{money(card.market_price)}</span>'
+            f"</a></div>"
+        )
+    base_query = "&".join(f"{key}={value}" for key, value in query.items() if key != "page")
+    return (
+        f'<div class="search-results"><div class="search-results__header">'
+        f"<h1><span>{len(cards)} results</span></h1></div>{''.join(results)}"
+        f"{pagination(f'{SEARCH_PATH}?{base_query}&', page, page_count, next_button=True)}</div>"
+    )
+
+
+def details_content(card: Card, page: int) -> str:
+    headers = "".join(
+        f'<div class="price-points__header__price"><span>{variant}</span></div>'
+        for variant in card.variants
+    )
+    # one row per price point with a column per variant, like the site's table
+    rows = []
+    for label, factor in PRICE_POINTS:
+        prices = "".join(
+            f'<td><span class="price">{money(card.market_price * factor * FOIL_FACTOR[v])}</span></td>'
+            for v in card.variants
+        )
+        rows.append(f"<tr><td>{label}</td>{prices}</tr>")
+    page_count = max(1, -(-len(card.listing_prices) // LISTINGS_PER_PAGE))
+    page = min(max(1, page), page_count)
+    listings = "".join(
+        f'<div class="listing-item"><span class="listing-item__price">{money(price)}</span></div>'
+        for price in card.listing_prices[(page - 1) * LISTINGS_PER_PAGE:page * LISTINGS_PER_PAGE]
+    )
+    return (
+        f'<h1 class="product-details__name">{html.escape(card.name)}</h1>'
+        f'<section class="price-points"><div class="price-points__header">{headers}</div>'
+        f'<table class="price-points__rows">{"".join(rows)}</table></section>'
+        f'<section class="listings">{listings}'
+        f"{pagination(f'{card.path}?', page, page_count, next_button=False)}</section>"
+    )
+
+
+def make_handler(catalogue: Dict[str, List[Card]], render_delay: int) -> type:
+    sets_by_slug = {slugify(set_name): cards for set_name, cards in catalogue.items()}
+    cards_by_path = {card.path: card for cards in catalogue.values() for card in cards}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            page = int(query.get("page", "1") or 1)
+            if url.path == SEARCH_PATH:
+                set_slug = query.get("setName")
+                if set_slug is None:
+                    body = render_page("Search", set_selector_content(catalogue), render_delay)
+                elif set_slug in sets_by_slug:
+                    page_size = int(query.get("pageSize", DEFAULT_PAGE_SIZE))
+                    content = search_content(sets_by_slug[set_slug], query, page, page_size)
+                    body = render_page("Search", content, render_delay)
+                else:
+                    return self.send_body(404, b"Unknown set", "text/plain")
+            elif url.path in cards_by_path:
+                card = cards_by_path[url.path]
+                body = render_page(card.name, details_content(card, page), render_delay)
+            else:
+                return self.send_body(404, b"Not found", "text/plain")
+            self.send_body(200, body, "text/html; charset=utf-8")
+
+        def send_body(self, status: int, body: bytes, content_type: str) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def make_server(
+    catalogue: Dict[str, List[Card]], render_delay: int = 0, port: int = 0
+) -> ThreadingHTTPServer:
+    """Start the server on a background thread. Port 0 picks a free port."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(catalogue, render_delay))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def search_url(server: ThreadingHTTPServer) -> str:
+    port = server.server_address[1]
+    return f"http://127.0.0.1:{port}{SEARCH_PATH}?productLineName=pokemon&page=1&view=grid"
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--sets", type=int, default=4, help="Number of sets in the catalogue.")
+    parser.add_argument("--cards", type=int, default=120, help="Number of cards per set.")
+    parser.add_argument("--render-delay", type=int, default=0,
+                        help="Milliseconds before a page's content is rendered by script.")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    add_arguments(parser)
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    catalogue = make_catalogue(args.sets, args.cards, args.seed)
+    server = make_server(catalogue, args.render_delay, args.port)
+    print(f"Serving {args.sets} sets x {args.cards} cards at {search_url(server)}")
+    print("Sets:", json.dumps(list(catalogue)))
+    threading.Event().wait()
@@ -0,0 +1,305 @@
+#===============================================================================
+# card_index.py - A persistent, on-disk index of previously scraped cards.
+#
+# The index is a small SQLite database keyed by the canonical product URL of a
+# card (the item's first_url). Each row stores the last scraped fields of the
+# card and the time they were scraped, so that later runs can skip the details
+# pages of cards whose data is still fresh.
+#
+# The prices shown for the card on the search grid are stored alongside, so a
+# later run can tell whether a card has moved without opening its details page.
+#
+# Lookups are made on the reactor thread, which in WAL mode never waits on a
+# writer. Writes can wait for another worker process's lock, so they are made
+# on a thread of their own, with its own connection.
+#===============================================================================
+
+from concurrent.futures import ThreadPoolExecutor
+
+import json
+import logging
+import os
+import sqlite3
+import time
+
+logger = logging.getLogger(__name__)
+
+# How long, in seconds, a connection waits for another process's lock before
+# giving up. Reads only wait during a WAL checkpoint.
+READ_TIMEOUT = 1
+WRITE_TIMEOUT = 2
+
+class CardIndex:
+    def __init__(self, path):
+        """
+        Opens (and creates if necessary) the card index at the given path.
+
+        Parameters
+        ----------
+        self : CardIndex
+            The CardIndex that this method is being called on.
+        path : str
+            The path of the SQLite database file.
+        """
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        # Sharded crawls share one index between processes. In WAL mode readers
+        # never wait on a writer, and since every store is committed straight
+        # away, a writer only waits for another worker's single row insert.
+        # With synchronous=NORMAL those commits don't sync the disk either.
+        self.connection = sqlite3.connect(path, timeout = READ_TIMEOUT)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS cards ("
+            "    url TEXT PRIMARY KEY,"
+            "    scraped_at REAL NOT NULL,"
+            "    data TEXT NOT NULL,"
+            "    search_low_price TEXT,"
+            "    search_market_price TEXT"
+            ")"
+        )
+
+        # Indexes written before the search price snapshot existed are missing
+        # its columns.
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(cards)")]
+        for column in ("search_low_price", "search_market_price"):
+            if column not in columns:
+                self.connection.execute(f"ALTER TABLE cards ADD COLUMN {column} TEXT")
+
+        self.connection.commit()
+
+        # Stores run one at a time, in order, on the writer thread, which opens
+        # its own connection since a connection can only be used by the thread
+        # that created it.
+        self.write_connection = None
+        self.writer = ThreadPoolExecutor(
+            max_workers = 1, thread_name_prefix = "card-index", initializer = self.open_writer
+        )
+
+    def open_writer(self):
+        """
+        Runs on the writer thread. Opens the connection used for stores.
+
+        Parameters
+        ----------
+        self : CardIndex
+            The CardIndex that this method is being called on.
+        """
+
+        self.write_connection = sqlite3.connect(self.path, timeout = WRITE_TIMEOUT)
+        self.write_connection.execute("PRAGMA synchronous=NORMAL")
+
+    @classmethod
+    def from_settings(cls, settings):
+        """
+        Opens the card index configured by the CARD_INDEX_* settings, or
+        returns None if the index is disabled.
+
+        Parameters
+        ----------
+        cls : type
+            The CardIndex class.
+        settings : Scrapy.Settings
+            The settings of the running crawler.
+        """
+
+        if not settings.getbool("CARD_INDEX_ENABLED"):
+            return None
+
+        return cls(settings.get("CARD_INDEX_PATH"))
+
+    def get(self, url):
+        """
+        Returns the stored fields and scrape time of a card.
+
+        Parameters
+        ----------
+        self : CardIndex
+            The CardIndex that this method is being called on.
+        url : str
+            The canonical product URL of the card.
+
+        Returns
+        -------
+        tuple or None
+            A (fields, scraped_at) tuple, or None if the card is not indexed.
+        """
+
+        row = self.connection.execute(
+            "SELECT data, scraped_at FROM cards WHERE url = ?", (url,)
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        data, scraped_at = row
+        return json.loads(data), scraped_at
+
+    def get_fresh(self, url, ttl):
+        """
+        Returns the stored fields of a card if they were scraped less than ttl
+        seconds ago.
+
+        Parameters
+        ----------
+        self : CardIndex
+            The CardIndex that this method is being called on.
+        url : str
+            The canonical product URL of the card.
+        ttl : float
+            The maximum age, in seconds, of a usable entry.
+
+        Returns
+        -------
+        dict or None
+            The stored fields, or None if the card is missing or stale.
+        """
+
+        entry = self.get(url)
+
+        if entry is None:
+            return None
+
+        fields, scraped_at = entry
+        if time.time() - scraped_at > ttl:
+            return None
+
+        return fields
+
+    def get_unchanged(self, url, low_price, market_price, max_age):
+        """
+        Returns the stored fields of a card if its search grid prices are the
+        same as when it was last scraped.
+
+        Parameters
+        ----------
+        self : CardIndex
+            The CardIndex that this method is being called on.
+        url : str
+            The canonical product URL of the card.
+        low_price : str
+            The low price currently shown on the search grid.
+        market_price : str
+            The market price currently shown on the search grid.
+        max_age : float
+            The maximum age, in seconds, of the stored details. Older entries
+            are treated as changed so that they are eventually re-scraped.
+
+        Returns
+        -------
+        tuple or None
+            A (fields, scraped_at) tuple, or None if the card has to be scraped.
+        """
+
+        row = self.connection.execute(
+            "SELECT data, scraped_at, search_low_price, search_market_price"
+            " FROM cards WHERE url = ?",
+            (url,),
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        data, scraped_at, previous_low_price, previous_market_price = row
+        if previous_low_price != low_price or previous_market_price != market_price:
+            return None
+
+        if time.time() - scraped_at > max_age:
+            return None
+
+        return json.loads(data), scraped_at
+
+    def store(self, item, search_prices = None, scraped_at = None):
+        """
+        Records the fields of a fully scraped card. The row is written on the
+        writer thread, so it may not be visible to get() straight away.
+
+        Parameters
+        ----------
+        self : CardIndex
+            The CardIndex that this method is being called on.
+        item : PokespiderItem
+            The item to record. Items without a first_url are ignored.
+        search_prices : tuple
+            The (low_price, market_price) shown for the card on the search grid.
+        scraped_at : float
+            When the details of the item were scraped. Defaults to now.
+        """
+
+        url = item.get('first_url')
+        if not url:
+            return
+
+        if search_prices is None:
+            search_prices = (None, None)
+
+        if scraped_at is None:
+            scraped_at = time.time()
+
+        self.writer.submit(self.write, url, scraped_at, json.dumps(dict(item)), search_prices)
+
+    def write(self, url, scraped_at, data, search_prices):
+        """
+        Runs on the writer thread. Writes the row of a card.
+
+        Parameters
+        ----------
+        self : CardIndex
+            The CardIndex that this method is being called on.
+        url : str
+            The canonical product URL of the card.
+        scraped_at : float
+            When the details of the card were scraped.
+        data : str
+            The fields of the card, as JSON.
+        search_prices : tuple
+            The (low_price, market_price) shown for the card on the search grid.
+        """
+
+        # The index is only an optimisation, so a write that can't get the
+        # lock is skipped rather than losing the card it was called for.
+        try:
+            with self.write_connection:
+                self.write_connection.execute(
+                    "INSERT OR REPLACE INTO cards"
+                    " (url, scraped_at, data, search_low_price, search_market_price)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (url, scraped_at, data, *search_prices),
+                )
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Could not store {url} in the card index: {e}")
+
+    def close_writer(self):
+        """
+        Runs on the writer thread. Closes the connection used for stores.
+
+        Parameters
+        ----------
+        self : CardIndex
+            The CardIndex that this method is being called on.
+        """
+
+        if self.write_connection is not None:
+            self.write_connection.close()
+            self.write_connection = None
+
+    def close(self):
+        """
+        Waits for the pending stores to be written, then closes the index.
+
+        Parameters
+        ----------
+        self : CardIndex
+            The CardIndex that this method is being called on.
+        """
+
+        self.writer.submit(self.close_writer)
+        self.writer.shutdown(wait = True)
+
+        self.connection.commit()
+        self.connection.close()
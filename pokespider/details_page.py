@@ -0,0 +1,37 @@
+#===============================================================================
+# details_page.py - Reads the fields of a card's details page in a single pass
+#                   over the page's parsed document.
+#
+# Like search_grid.py, the selectors are compiled to XPath once, when this
+# module is imported, so that the same extraction can run on a response's
+# document in the spider or on the page's HTML in a parse pool worker.
+#===============================================================================
+
+from pokespider.search_grid import compile_css
+
+# Selectors for the fields read from a card's details pages.
+DETAILS_PAGE_SELECTORS = {
+    "headers":          ".price-points__header__price *::text",
+    "prices":           ".price-points .price::text",
+    "pagination_urls":  ".tcg-pagination__pages a::attr(href)",
+    "listing_prices":   ".listing-item__price::text",
+}
+
+DETAILS_PAGE_XPATHS = {field: compile_css(selector) for field, selector in DETAILS_PAGE_SELECTORS.items()}
+
+def extract_details_page(root):
+    """
+    Reads the fields of a card's details page.
+
+    Parameters
+    ----------
+    root : lxml.html.HtmlElement
+        The root of the parsed details page, e.g. response.selector.root.
+
+    Returns
+    -------
+    dict
+        The list of values for each field in DETAILS_PAGE_SELECTORS.
+    """
+
+    return {field: xpath(root) for field, xpath in DETAILS_PAGE_XPATHS.items()}
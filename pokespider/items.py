@@ -37,6 +37,8 @@ class PokespiderItem(Item):
 
     error_encountered = Field(name = "Errors")
 
+    reused = Field(name = "Reused")
+
 
     def print_indented(self):
         print(f"    first_url:          {self['card_series']}")
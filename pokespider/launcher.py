@@ -0,0 +1,314 @@
+#===============================================================================
+# launcher.py - Runs the main spider across several worker processes.
+#
+# The selected sets are split between N worker processes. Each worker runs its
+# own crawl, with its own Playwright browser, and exports its CSV files to its
+# own directory. When all of the workers have finished, their CSV files are
+# moved into the normal export directory and their crawl stats are merged.
+#
+# Usage:
+#   python -m pokespider.launcher --workers 8
+#   python -m pokespider.launcher --workers 4 --sets "SV01: Scarlet & Violet Base Set"
+#   python -m pokespider.launcher --all-sets -s CONCURRENT_REQUESTS=8
+#===============================================================================
+
+from datetime import datetime
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import re
+import shutil
+
+from pokespider.set_catalog import SetCatalog
+
+logger = logging.getLogger(__name__)
+
+WORKER_DIR_NAME = ".workers"
+
+# Stats that count things, and so add up across workers.
+SUMMED_STATS = re.compile(
+    r"^(downloader|scheduler|log_count|retry|httperror|dupefilter|offsite|spider_exceptions"
+    r"|item_dropped_reasons_count|request_depth_count|pokespider|playwright"
+    r"|memusage/soft_limit|memory_sampler/samples)(/|$)"
+    r"|_count$"
+)
+
+# Stats under the prefixes above that are gauges or rates rather than counts.
+PER_WORKER_STATS = re.compile(r"^playwright/page_limit$|/hit_rate$|^memusage/soft_limit/current$")
+
+# Peaks and troughs, e.g. pokespider/wip/max or playwright/autotune/min_limit.
+MAX_STATS = re.compile(r"(^|[/_])max([/_]|$)")
+MIN_STATS = re.compile(r"(^|[/_])min([/_]|$)")
+
+def split_sets(set_names, worker_count):
+    """
+    Splits a list of sets into at most worker_count shards of similar size.
+
+    Parameters
+    ----------
+    set_names : list
+        The names of the sets to split.
+    worker_count : int
+        The number of worker processes.
+
+    Returns
+    -------
+    list
+        A list of non-empty lists of set names.
+    """
+
+    shards = [set_names[index::worker_count] for index in range(worker_count)]
+    return [shard for shard in shards if shard]
+
+def run_worker(index, set_names, export_dir, overrides, result_queue):
+    """
+    Runs one crawl of the main spider over the passed sets. This is the target
+    of each worker process.
+
+    Parameters
+    ----------
+    index : int
+        The index of this worker.
+    set_names : list
+        The sets this worker should scrape.
+    export_dir : str
+        The directory this worker exports its CSV files to.
+    overrides : dict
+        Settings to override for this worker.
+    result_queue : multiprocessing.Queue
+        Queue the crawl stats of the worker are put on once it finishes.
+    """
+
+    # Imported here so that the reactor is only installed inside the worker.
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+
+    settings = get_project_settings()
+    settings.setdict(overrides, priority="cmdline")
+    settings.set("USE_SET_SELECTION_WINDOW", False, priority="cmdline")
+    settings.set("DEFAULT_SET_LIST", set_names, priority="cmdline")
+    settings.set("SET_LIST_FILE", None, priority="cmdline")
+    settings.set("EXPORT_PATH_BASE", export_dir, priority="cmdline")
+    if settings.get("PLAYWRIGHT_MEMORY_SAMPLER_CSV"):
+        # merged with the other workers' samples like the exported CSV files
+        settings.set("PLAYWRIGHT_MEMORY_SAMPLER_CSV",
+            os.path.join(export_dir, os.path.basename(settings.get("PLAYWRIGHT_MEMORY_SAMPLER_CSV"))),
+            priority="cmdline")
+
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler("main")
+    process.crawl(crawler)
+    process.start()
+
+    result_queue.put((index, crawler.stats.get_stats()))
+
+def merge_exports(worker_dirs, export_dir):
+    """
+    Moves the CSV files exported by each worker into the export directory,
+    keeping the same layout. The first worker to export a file replaces any
+    copy left in the export directory by an earlier run, and the rows of any
+    later worker that exported the same file are appended to it without
+    repeating the header.
+
+    Parameters
+    ----------
+    worker_dirs : list
+        The export directories of the workers.
+    export_dir : str
+        The directory the merged files are written to.
+    """
+
+    # The files written by this run, as opposed to ones already in export_dir.
+    merged_paths = set()
+
+    for worker_dir in worker_dirs:
+        for root, _, file_names in os.walk(worker_dir):
+            for file_name in file_names:
+                source_path = os.path.join(root, file_name)
+                relative_path = os.path.relpath(source_path, worker_dir)
+                target_path = os.path.join(export_dir, relative_path)
+
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+
+                if target_path not in merged_paths:
+                    os.replace(source_path, target_path)
+                    merged_paths.add(target_path)
+                    continue
+
+                with open(source_path, "rb") as source, open(target_path, "ab") as target:
+                    source.readline()
+                    shutil.copyfileobj(source, target)
+                os.remove(source_path)
+
+def get_stat_combiner(key, value):
+    """
+    Returns the function that combines the values of a stat from two workers,
+    or None if the stat should be kept per worker.
+
+    Parameters
+    ----------
+    key : str
+        The name of the stat.
+    value : object
+        The value of the stat in one of the workers.
+    """
+
+    if key == "start_time":
+        return min
+    if key == "finish_time":
+        return max
+
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        return None
+
+    if MAX_STATS.search(key):
+        return max
+    if MIN_STATS.search(key):
+        return min
+
+    if SUMMED_STATS.search(key) and not PER_WORKER_STATS.search(key):
+        return lambda total, value: total + value
+
+    return None
+
+def merge_stats(worker_stats):
+    """
+    Combines the crawl stats of several workers into one dictionary.
+
+    Known counters are summed, "max" and "min" values take the maximum and
+    minimum, start times take the earliest and finish times take the latest.
+    Other values, such as gauges and latency percentiles, are kept per worker
+    as <key>/worker_<index>, since they can't be combined.
+
+    Parameters
+    ----------
+    worker_stats : dict
+        The crawl stats of each worker, keyed by worker index.
+    """
+
+    merged = {}
+
+    for index, stats in sorted(worker_stats.items()):
+        for key, value in stats.items():
+            combine = get_stat_combiner(key, value)
+
+            if combine is None:
+                merged[f"{key}/worker_{index}"] = value
+            elif key not in merged:
+                merged[key] = value
+            else:
+                merged[key] = combine(merged[key], value)
+
+    merged["launcher/worker_count"] = len(worker_stats)
+
+    return merged
+
+def parse_overrides(values):
+    """
+    Parses NAME=VALUE settings overrides from the command line.
+
+    Parameters
+    ----------
+    values : list
+        The raw NAME=VALUE strings.
+    """
+
+    overrides = {}
+
+    for value in values:
+        name, _, setting = value.partition("=")
+        overrides[name] = setting
+
+    return overrides
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(
+        description="Run the main spider with the selected sets split across several processes."
+    )
+    parser.add_argument("--workers", "-w", type=int, default=os.cpu_count(),
+        help="Number of worker processes. Defaults to the number of CPUs.")
+    parser.add_argument("--sets", nargs="+",
+        help="Sets to scrape. Defaults to the DEFAULT_SET_LIST setting.")
+    parser.add_argument("--all-sets", action="store_true",
+        help="Scrape every set in the cached set catalog.")
+    parser.add_argument("--set", "-s", dest="overrides", action="append", default=[],
+        metavar="NAME=VALUE", help="Override a setting in every worker.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    from scrapy.utils.project import get_project_settings
+
+    settings = get_project_settings()
+    overrides = parse_overrides(args.overrides)
+    settings.setdict(overrides, priority="cmdline")
+
+    set_names = args.sets or settings.getlist("DEFAULT_SET_LIST")
+    if args.all_sets:
+        catalog = SetCatalog.load(settings.get("SET_CATALOG_PATH"))
+        if catalog is None:
+            parser.error("No set catalog found. Run a single crawl first to cache it.")
+        set_names = catalog.names()
+
+    if not set_names:
+        parser.error("No sets to scrape. Pass --sets or --all-sets, or fill in DEFAULT_SET_LIST.")
+
+    shards = split_sets(set_names, max(1, args.workers))
+
+    export_dir = settings.get("EXPORT_PATH_BASE")
+    run_dir = os.path.join(export_dir, WORKER_DIR_NAME, datetime.now().strftime("%Y_%m_%d_%H_%M_%S"))
+    worker_dirs = [os.path.join(run_dir, str(index)) + "/" for index in range(len(shards))]
+
+    logger.info("Scraping %i sets across %i workers", len(set_names), len(shards))
+
+    # Use fresh interpreters so that each worker installs its own reactor.
+    mp_context = multiprocessing.get_context("spawn")
+    result_queue = mp_context.Queue()
+
+    workers = []
+    for index, shard in enumerate(shards):
+        worker = mp_context.Process(
+            target=run_worker,
+            args=(index, shard, worker_dirs[index], overrides, result_queue),
+            name=f"pokespider-worker-{index}",
+        )
+        worker.start()
+        workers.append(worker)
+
+    # Drain the queue before joining, since a worker cannot exit while its
+    # stats are still buffered in the queue.
+    worker_stats = {}
+    while len(worker_stats) < len(workers) and any(worker.is_alive() for worker in workers):
+        try:
+            index, stats = result_queue.get(timeout=1)
+        except queue.Empty:
+            continue
+        worker_stats[index] = stats
+
+    for worker in workers:
+        worker.join()
+        if worker.exitcode != 0:
+            logger.error("Worker %s exited with code %s", worker.name, worker.exitcode)
+
+    while not result_queue.empty():
+        index, stats = result_queue.get()
+        worker_stats[index] = stats
+
+    merge_exports(worker_dirs, export_dir)
+    shutil.rmtree(run_dir, ignore_errors=True)
+
+    stats = merge_stats(worker_stats)
+    stats_path = os.path.join(export_dir, "crawl_stats.json")
+    with open(stats_path, "w") as stats_file:
+        json.dump(stats, stats_file, indent=4, sort_keys=True, default=str)
+
+    logger.info("Merged crawl stats written to %s", stats_path)
+
+    return 0 if all(worker.exitcode == 0 for worker in workers) else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
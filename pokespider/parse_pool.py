@@ -0,0 +1,160 @@
+#===============================================================================
+# parse_pool.py - Parses rendered pages in a pool of worker processes or threads
+#                 instead of on the reactor.
+#
+# The asyncio loop that runs the spider callbacks also drives Playwright, so
+# parsing a large page in a callback stalls the event handling of every other
+# open page. When PARSE_POOL_ENABLED is set, ParsePoolMiddleware hands the HTML
+# of search and details pages to the pool as they are downloaded, and stores
+# the extracted fields in the request's parsed_fields meta key. The spider uses
+# those instead of parsing the page itself.
+#===============================================================================
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.http import HtmlResponse
+from parsel import Selector
+from scrapy_playwright.timing import get_latency_histograms
+
+from pokespider.details_page import extract_details_page
+from pokespider.search_grid import extract_search_page
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# The extraction run for each request kind (the request_kind meta key).
+EXTRACTORS = {
+    "search":           extract_search_page,
+    "first_details":    extract_details_page,
+    "last_details":     extract_details_page,
+}
+
+def parse_page(kind, text):
+    """
+    Parses a page and extracts its fields. Runs in a pool worker.
+
+    Parameters
+    ----------
+    kind : str
+        The request kind of the page, a key of EXTRACTORS.
+    text : str
+        The HTML of the page.
+
+    Returns
+    -------
+    tuple
+        When the worker started on the page, as a time.time() timestamp, and
+        the extracted fields.
+    """
+
+    started_at = time.time()
+    return started_at, EXTRACTORS[kind](Selector(text = text).root)
+
+class ParsePoolMiddleware:
+    def __init__(self, crawler):
+        """
+        Parameters
+        ----------
+        self : ParsePoolMiddleware
+            The ParsePoolMiddleware that this method is being called on.
+        crawler : Scrapy.Crawler
+            The crawler that this middleware belongs to.
+        """
+
+        settings = crawler.settings
+
+        if not settings.getbool("PARSE_POOL_ENABLED"):
+            raise NotConfigured
+
+        self.crawler = crawler
+        self.stats = crawler.stats
+
+        pool_type = settings.get("PARSE_POOL_TYPE", "process")
+        pool_size = settings.getint("PARSE_POOL_SIZE") or os.cpu_count() or 1
+
+        if pool_type == "process":
+            # Spawn rather than fork, since the reactor and browser driver
+            # threads of this process must not be copied into the workers.
+            self.executor = ProcessPoolExecutor(
+                max_workers = pool_size, mp_context = multiprocessing.get_context("spawn")
+            )
+        elif pool_type == "thread":
+            self.executor = ThreadPoolExecutor(max_workers = pool_size, thread_name_prefix = "parse")
+        else:
+            raise NotConfigured(f"Unknown PARSE_POOL_TYPE: {pool_type!r}")
+
+        self.in_flight = 0
+
+        logger.info("Parsing pages in a %s pool of %i workers", pool_type, pool_size)
+
+        crawler.signals.connect(self.spider_closed, signal = signals.spider_closed)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def spider_closed(self, spider):
+        self.executor.shutdown(wait = False, cancel_futures = True)
+
+    async def process_response(self, request, response, spider):
+        """
+        Extracts the fields of search and details pages in the pool, before the
+        response reaches the spider.
+
+        Parameters
+        ----------
+        self : ParsePoolMiddleware
+            The ParsePoolMiddleware that this method is being called on.
+        request : Scrapy.Request
+            The request that the response is for.
+        response : Scrapy.Response
+            The downloaded page.
+        spider : Scrapy.Spider
+            The spider that the page is for.
+        """
+
+        kind = request.meta.get("request_kind")
+
+        # Pages extracted inside the browser are already just their fields.
+        if kind not in EXTRACTORS or request.meta.get("playwright_extract") \
+                or not isinstance(response, HtmlResponse):
+            return response
+
+        self.in_flight += 1
+        self.stats.max_value("pokespider/parse_pool/in_flight/max", self.in_flight)
+
+        submitted_at = time.time()
+        try:
+            started_at, fields = await asyncio.wrap_future(
+                self.executor.submit(parse_page, kind, response.text)
+            )
+        except Exception as e:
+            # Leave the page to be parsed by the spider as usual, e.g. if a
+            # worker process died.
+            logger.warning("Parse pool failed on %s: %r", response.url, e)
+            self.stats.inc_value("pokespider/parse_pool/errors")
+            return response
+        finally:
+            self.in_flight -= 1
+
+        finished_at = time.time()
+        queue_delay = max(0.0, started_at - submitted_at)
+
+        self.stats.inc_value("pokespider/parse_pool/pages")
+        self.stats.inc_value("pokespider/parse_pool/queue_delay/total", queue_delay)
+        self.stats.max_value("pokespider/parse_pool/queue_delay/max", queue_delay)
+
+        histograms = get_latency_histograms(self.crawler)
+        if histograms is not None:
+            histograms.observe(kind, "parse_queue", queue_delay)
+            histograms.observe(kind, "parse_pool", finished_at - submitted_at)
+
+        request.meta['parsed_fields'] = fields
+
+        return response
@@ -2,7 +2,8 @@
 # pipelines.py - Pipelines that items pass through after being scraped. 
 #
 # This file currently only implements a pipeline that sorts items based on the
-# card set they are from, and exports each set to a separate CSV
+# card set they are from, and exports each set to a separate CSV. The files are
+# written on a background thread so that disk I/O stays off the reactor.
 #===============================================================================
 
 
@@ -15,14 +16,22 @@
 # useful for handling different item types with a single interface
 from itemadapter import ItemAdapter
 from scrapy.exporters import CsvItemExporter
+from scrapy_playwright.timing import get_latency_histograms
 from datetime import datetime
 
+import logging
 import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
 
 class PokespiderPipeline:
     def open_spider(self, spider):
         """
-        Called by Scrapy when a spider is opened
+        Called by Scrapy when a spider is opened. Starts the thread that writes
+        the items to the CSV files.
 
         Parameters
         ----------
@@ -32,12 +41,34 @@ class PokespiderPipeline:
             The spider that this pipeline is being opened for.
         """
 
+        settings = spider.settings
+
         self.open_date_time = datetime.now()
         self.series_to_exporter = {}
 
+        self.stats = spider.crawler.stats
+        self.histograms = get_latency_histograms(spider.crawler)
+        self.log_items = settings.getbool("EXPORT_LOG_ITEMS")
+        self.batch_size = max(1, settings.getint("EXPORT_BATCH_SIZE", 1))
+        self.flush_interval = settings.getfloat("EXPORT_FLUSH_INTERVAL")
+
+        # Items waiting to be written, and the latency of the writes, which
+        # only the writer thread updates until it is stopped in close_spider.
+        self.item_queue = queue.Queue()
+        self.write_errors = 0
+        self.write_count = 0
+        self.write_seconds = 0.0
+        self.max_write_seconds = 0.0
+
+        self.writer_thread = threading.Thread(
+            target = self.write_items, args = (spider,), name = "csv-writer", daemon = True
+        )
+        self.writer_thread.start()
+
     def close_spider(self, spider):
         """
-        Called by Scrapy when a spider is opened
+        Called by Scrapy when a spider is closed. Waits for every queued item
+        to be written, then flushes the CSV files to disk and closes them.
 
         Parameters
         ----------
@@ -47,11 +78,107 @@ class PokespiderPipeline:
             The spider that this pipeline is being close for.
         """
 
+        self.item_queue.put(None)
+        self.writer_thread.join()
+
         # Flush and close all our exporters so that we don't lose any data 
         for exporter, csv_file in self.series_to_exporter.values():
             exporter.finish_exporting()
+            csv_file.flush()
+            os.fsync(csv_file.fileno())
             csv_file.close()
 
+        self.stats.set_value("pokespider/export/items_written", self.write_count)
+        self.stats.set_value("pokespider/export/write_latency/total", self.write_seconds)
+        self.stats.set_value("pokespider/export/write_latency/max", self.max_write_seconds)
+
+        if self.write_errors > 0:
+            self.stats.set_value("pokespider/export/errors", self.write_errors)
+            logger.error(f"{self.write_errors} items could not be written to CSV")
+
+    def write_items(self, spider):
+        """
+        Runs on the writer thread. Writes queued items to their CSV files, and
+        flushes the files every EXPORT_BATCH_SIZE items or EXPORT_FLUSH_INTERVAL
+        seconds, whichever comes first, until close_spider queues None.
+
+        Parameters
+        ----------
+        self : PokespiderPipeline
+            The PokespiderPipeline that this method is being called on.
+        spider : Scrapy.Spider
+            The spider that this pipeline is being run on.
+        """
+
+        unflushed = 0
+        last_flush = time.monotonic()
+
+        while True:
+            # Only wake up without a new item if there is something to flush.
+            timeout = None
+            if unflushed > 0 and self.flush_interval > 0:
+                timeout = max(0.0, last_flush + self.flush_interval - time.monotonic())
+
+            try:
+                item = self.item_queue.get(timeout = timeout)
+            except queue.Empty:
+                item = False
+
+            if item is None:
+                return
+
+            if item is not False:
+                start = time.perf_counter()
+                try:
+                    exporter, csv_file = self.get_exporter(item, spider)
+                    exporter.export_item(item)
+                except Exception:
+                    # Skip just this item, the others can still be written.
+                    logger.error(
+                        f"Writing item to CSV failed, skipping it: {dict(item)}", exc_info = True
+                    )
+                    self.write_errors += 1
+                    continue
+                self.record_write("export", time.perf_counter() - start)
+
+                # The flush interval runs from the oldest unflushed item.
+                if unflushed == 0:
+                    last_flush = time.monotonic()
+                unflushed += 1
+
+            flush_due = self.flush_interval > 0 and time.monotonic() - last_flush >= self.flush_interval
+            if unflushed > 0 and (unflushed >= self.batch_size or flush_due):
+                start = time.perf_counter()
+                for exporter, csv_file in self.series_to_exporter.values():
+                    csv_file.flush()
+                self.record_write("flush", time.perf_counter() - start)
+                unflushed = 0
+                last_flush = time.monotonic()
+
+    def record_write(self, stage, seconds):
+        """
+        Records how long the writer thread took to write an item or flush the
+        files.
+
+        Parameters
+        ----------
+        self : PokespiderPipeline
+            The PokespiderPipeline that this method is being called on.
+        stage : str
+            "export" for an item or "flush" for the files.
+        seconds : float
+            How long it took.
+        """
+
+        self.write_seconds += seconds
+        self.max_write_seconds = max(self.max_write_seconds, seconds)
+
+        if stage == "export":
+            self.write_count += 1
+
+        if self.histograms is not None:
+            self.histograms.observe("item", stage, seconds)
+
     def open_csv(self, set_name, spider):
         """
         Opens a CSV file based on the passed set_name
@@ -115,7 +242,8 @@ class PokespiderPipeline:
                 "foil_market_price":    "Foil Market Price",
                 "foil_median_price":    "Foil Median Price",
                 "first_url":            "URL",
-                "errors_encountered":   "Errors"
+                "errors_encountered":   "Errors",
+                "reused":               "Reused"
             }
 
             exporter.start_exporting()
@@ -126,8 +254,8 @@ class PokespiderPipeline:
 
     def process_item(self, item, spider):
         """
-        Processes an item. Exports the items to different CSV based on the set
-        name. 
+        Processes an item. Queues the item to be exported to the CSV of its set
+        by the writer thread.
 
         Parameters
         ----------
@@ -139,23 +267,20 @@ class PokespiderPipeline:
             The item that we want the exporter for 
         """
         
-        print(f"\n\n\n\n\n\n PROCESSING ITEM!!!!!!")
-        
-        print(f"    url    = {item['first_url']}")
-        print(f"    order  = {item['card_order']}")
-        print(f"    series = {item['card_series']}")
-        print(f"    name   = {item['card_name']}")
-        print(f"    rarity = {item['card_rarity']}")
-        print(f"    low    = {item['low_price']}")
-        print(f"    high   = {item['high_price']}")
-        print(f"    market = {item['market_price']}")
-        print(f"    median = {item['median_price']}")
-        print(f"    f_mark = {item['foil_market_price']}")
-        print(f"    f_medi = {item['foil_median_price']}")
-
-        exporter, csv_file = self.get_exporter(item, spider)
-        exporter.export_item(item)
-
-        csv_file.flush()
+        # Build the message only when it will actually be logged.
+        if self.log_items and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Processing item:\n" + "\n".join(
+                    f"    {field:<18} = {item.get(field)}" for field in (
+                        "first_url", "card_order", "card_series", "card_name", "card_rarity",
+                        "low_price", "high_price", "market_price", "median_price",
+                        "foil_market_price", "foil_median_price",
+                    )
+                )
+            )
+
+        # Writing happens on the writer thread, so the reactor only queues it.
+        self.item_queue.put(item)
+        self.stats.max_value("pokespider/export/queue_depth/max", self.item_queue.qsize())
 
         return item
@@ -0,0 +1,128 @@
+#===============================================================================
+# search_grid.py - Reads every card in a search page's results grid in a
+#                  single pass over the page's parsed document.
+#
+# The selectors for each field are compiled to XPath once, when this module is
+# imported, and run directly against the result panels of the page, instead of
+# serialising each panel back to HTML and parsing it again on its own. Only
+# plain data is returned, so the extraction can also run in a parse pool worker.
+#===============================================================================
+
+from lxml import etree
+from parsel.csstranslator import css2xpath
+
+def compile_css(css):
+    """
+    Compiles a CSS selector, optionally with a ::text or ::attr() pseudo
+    element, into an XPath that returns plain strings.
+
+    Parameters
+    ----------
+    css : str
+        The CSS selector to compile.
+    """
+
+    return etree.XPath(css2xpath(css), smart_strings = False)
+
+SEARCH_RESULTS = compile_css(".search-result")
+
+SUBTITLE_TEXT = compile_css(".product-card__subtitle::text")
+RARITY_SPANS = compile_css(".product-card__rarity span")
+SPAN_TEXT = compile_css("span::text")
+TITLE_TEXT = compile_css(".product-card__title::text")
+
+# Not actually the price with shipping, the site just never renamed the class.
+MINIMUM_PRICE_TEXT = compile_css(".inventory__price-with-shipping::text")
+MARKET_PRICE_TEXT = compile_css(".product-card__market-price--value::text")
+URL = compile_css("a::attr(href)")
+
+HEADER_TEXT = compile_css(".search-results__header *::text")
+PAGE_NUMBER_TEXT = compile_css(".tcg-pagination__pages a::text")
+NEXT_PAGE_URL = etree.XPath('.//a[@aria-label="Next page"]/@href', smart_strings = False)
+
+def first(values):
+    """
+    Returns the first of the passed values, or None if there are none.
+    """
+
+    return values[0] if values else None
+
+def extract_search_results(root):
+    """
+    Reads the fields of every card in a search page's results grid.
+
+    Parameters
+    ----------
+    root : lxml.html.HtmlElement
+        The root of the parsed search page, e.g. response.selector.root.
+
+    Returns
+    -------
+    list of dict
+        The search grid fields of each card, in page order, keyed by the name
+        of the PokespiderItem field they belong to.
+    """
+
+    results = []
+
+    for search_result in SEARCH_RESULTS(root):
+        card_series = first(SUBTITLE_TEXT(search_result)).replace(": ", " - ")
+
+        rarity_spans = RARITY_SPANS(search_result)
+
+        # If this card doesn't have a rarity associated with it. Skip it because
+        # it's a pack of some sort we don't care about
+        card_rarity = None
+        if len(rarity_spans) > 0:
+            card_rarity = first(SPAN_TEXT(rarity_spans[0]))
+
+        # Check that the search result card actually has a card number.
+        # Occasionally, some promo cards aren't actually used in deck building
+        # and won't have a card number
+        card_number = None
+        if len(rarity_spans) >= 3:
+            card_number = first(SPAN_TEXT(rarity_spans[2])).split('/')[0].strip("#")
+
+        card_name = first(TITLE_TEXT(search_result)).split('-')[0].strip()
+
+        results.append({
+            "first_url":    first(URL(search_result)),
+            "card_name":    card_name,
+            "card_order":   card_number,
+            "card_series":  card_series,
+            "card_rarity":  card_rarity,
+            "low_price":    first(MINIMUM_PRICE_TEXT(search_result)),
+            "market_price": first(MARKET_PRICE_TEXT(search_result)),
+        })
+
+    return results
+
+def extract_search_page(root):
+    """
+    Reads everything the spider needs from a search page: its cards, and what
+    is needed to find the rest of the set's search pages.
+
+    Parameters
+    ----------
+    root : lxml.html.HtmlElement
+        The root of the parsed search page, e.g. response.selector.root.
+
+    Returns
+    -------
+    dict
+        search_results  - The fields of each card, see extract_search_results.
+        header_text     - The text of the results header, holding the total
+                          number of results.
+        page_numbers    - The page numbers listed in the pagination bar.
+        next_page_url   - The URL of the next-page button, or None on the last
+                          page.
+    """
+
+    return {
+        "search_results":   extract_search_results(root),
+        "header_text":      " ".join(HEADER_TEXT(root)),
+        "page_numbers":     [
+            int(text.strip()) for text in PAGE_NUMBER_TEXT(root) if text.strip().isdigit()
+        ],
+        "next_page_url":    first(NEXT_PAGE_URL(root)),
+    }
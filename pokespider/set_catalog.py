@@ -0,0 +1,130 @@
+#===============================================================================
+# set_catalog.py - An on-disk cache of the card sets listed on TCGPlayer.com.
+#
+# Reading the list of sets needs a full browser render of the search page. The
+# catalog stores each set's name and the exact URL slug used to search for it,
+# so that runs within the TTL of the cache can go straight to the search pages
+# of the selected sets.
+#===============================================================================
+
+import json
+import os
+import tempfile
+import time
+
+class SetCatalog:
+    def __init__(self, sets, fetched_at = None):
+        """
+        Creates a catalog from a list of sets.
+
+        Parameters
+        ----------
+        self : SetCatalog
+            The SetCatalog that this method is being called on.
+        sets : dict
+            The URL slug of each set, keyed by the set's name as shown on the
+            site. Insertion order is the order the site lists them in.
+        fetched_at : float
+            When the sets were read from the site. Defaults to now.
+        """
+
+        self.sets = sets
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a catalog from disk.
+
+        Parameters
+        ----------
+        cls : type
+            The SetCatalog class.
+        path : str
+            The path of the catalog file.
+
+        Returns
+        -------
+        SetCatalog or None
+            The catalog, or None if the file does not exist or can't be read.
+        """
+
+        try:
+            with open(path, "r", encoding="utf-8") as catalog_file:
+                data = json.load(catalog_file)
+            return cls(
+                {entry["name"]: entry["slug"] for entry in data["sets"]},
+                fetched_at = data["fetched_at"],
+            )
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    @classmethod
+    def load_fresh(cls, path, ttl):
+        """
+        Loads a catalog from disk if it is younger than ttl seconds.
+
+        Parameters
+        ----------
+        cls : type
+            The SetCatalog class.
+        path : str
+            The path of the catalog file.
+        ttl : float
+            The maximum age, in seconds, of a usable catalog.
+        """
+
+        catalog = cls.load(path)
+
+        if catalog is None or catalog.age() > ttl:
+            return None
+
+        return catalog
+
+    def save(self, path):
+        """
+        Writes the catalog to disk.
+
+        Parameters
+        ----------
+        self : SetCatalog
+            The SetCatalog that this method is being called on.
+        path : str
+            The path of the catalog file.
+        """
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        data = {
+            "fetched_at": self.fetched_at,
+            "sets": [{"name": name, "slug": slug} for name, slug in self.sets.items()],
+        }
+
+        # Write to a temporary file first so that a concurrent reader never
+        # sees a half written catalog. The launcher's workers can all save the
+        # catalog at once, so each one needs a temporary file of its own.
+        temp_fd, temp_path = tempfile.mkstemp(
+            dir = directory or ".", prefix = os.path.basename(path) + ".", suffix = ".tmp"
+        )
+        try:
+            with os.fdopen(temp_fd, "w", encoding="utf-8") as catalog_file:
+                json.dump(data, catalog_file, indent=4)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def age(self):
+        return time.time() - self.fetched_at
+
+    def names(self):
+        return list(self.sets.keys())
+
+    def slug(self, set_name):
+        return self.sets[set_name]
+
+    def __contains__(self, set_name):
+        return set_name in self.sets
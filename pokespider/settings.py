@@ -53,15 +53,19 @@ DEFAULT_REQUEST_HEADERS = {
 
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
-#DOWNLOADER_MIDDLEWARES = {
+DOWNLOADER_MIDDLEWARES = {
 #    "pokespider.middlewares.PokespiderDownloaderMiddleware": 543,
-#}
+    # Close to the engine, so that pages are only parsed once retries are done
+    "pokespider.parse_pool.ParsePoolMiddleware": 50,
+}
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
 EXTENSIONS = {
     "scrapy.extensions.memusage.MemoryUsage": None,
     "scrapy_playwright.memusage.ScrapyPlaywrightMemoryUsageExtension": 0,
+    "scrapy_playwright.memusage.ScrapyPlaywrightMemorySampler": 0,
+    "scrapy_playwright.timing.LatencyHistogramsExtension": 0,
 }
 
 # Configure item pipelines
@@ -114,6 +118,54 @@ PLAYWRIGHT_LAUNCH_OPTIONS = {
     "timeout":  60 * 1000,     # 60 seconds
 }
 
+# Only wait for the DOM to be parsed when navigating. Each request waits for the
+# selectors it needs instead of the full load event, which waits on every image,
+# font and script on the page.
+PLAYWRIGHT_DEFAULT_GOTO_WAIT_UNTIL = "domcontentloaded"
+
+# Subrequests that pages don't need in order to render the data we scrape. Each
+# policy can block by resource type, host (deny_hosts, or everything outside of
+# allow_hosts) and URL regex. Requests pick a preset with the
+# playwright_block_preset meta key, and fall back to PLAYWRIGHT_BLOCK_POLICY.
+_TRACKER_HOSTS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "facebook.net",
+    "hotjar.com",
+    "segment.io",
+    "bing.com",
+]
+
+PLAYWRIGHT_BLOCK_POLICY = {
+    "resource_types": ["image", "media", "font"],
+    "deny_hosts": _TRACKER_HOSTS,
+}
+
+PLAYWRIGHT_BLOCK_POLICY_PRESETS = {
+    "search": {
+        "resource_types": ["image", "media", "font"],
+        "deny_hosts": _TRACKER_HOSTS,
+    },
+    "details": {
+        "resource_types": ["image", "media", "font", "stylesheet"],
+        "deny_hosts": _TRACKER_HOSTS,
+    },
+}
+
+# Blocked requests are counted in playwright/request_count/blocked/
+# estimated_bytes_saved, at the average size of the unblocked responses of the
+# same resource type. Types that every preset blocks are never seen unblocked,
+# so they are counted at the sizes in bytes given here instead, e.g.
+# {"image": 80_000}. The handler has defaults for image, media, font, stylesheet
+# and script.
+PLAYWRIGHT_BLOCKED_SIZE_ESTIMATES = {}
+
+# Search page the crawl starts from. Defaults to the TCGPlayer.com Pokemon search
+# page; the benchmarks point it at a local stand-in server.
+#SEARCH_URL = "https://www.tcgplayer.com/search/pokemon/product?productLineName=pokemon&page=1&view=grid"
+
 # Whether or not to use the set selector window. You can turn this off if you 
 # decide you want to hardcode the sets in the DEFAULT_SET_LIST setting below.
 USE_SET_SELECTION_WINDOW = True
@@ -123,8 +175,228 @@ USE_SET_SELECTION_WINDOW = True
 DEFAULT_SET_LIST = [
 ]
 
+# Optional path of a file listing the sets to scrape, one per line. Takes
+# priority over the two settings above. The sets can also be passed on the
+# command line with `scrapy crawl main -a sets="Set A;Set B"`.
+SET_LIST_FILE = None
+
+# The list of sets on TCGPlayer.com, along with the URL slug of each one, is
+# cached here so that runs don't need to render the search page to read it.
+SET_CATALOG_PATH = "./out/set_catalog.json"
+
+# Maximum age, in seconds, of the cached set catalog before it is read from the
+# site again.
+SET_CATALOG_TTL = 7 * 24 * 60 * 60
+
 EXPORT_PATH_BASE = "./out"
 
 EXPORT_PATH_WITH_DATE = True
 
-EXPORT_PATH_NESTED = True
\ No newline at end of file
+EXPORT_PATH_NESTED = True
+
+# Items are written to the CSV files on a background thread, which flushes the
+# files every EXPORT_BATCH_SIZE items or EXPORT_FLUSH_INTERVAL seconds, whichever
+# comes first (0 for no interval). Everything queued is written and synced to
+# disk when the spider closes. Write latency and the peak queue depth are
+# reported under pokespider/export/.
+EXPORT_BATCH_SIZE = 100
+EXPORT_FLUSH_INTERVAL = 5
+
+# Whether to log the fields of every item as it is exported, at DEBUG level.
+EXPORT_LOG_ITEMS = False
+
+# Whether to read the number of search pages from the first search page of a
+# set and request all of them at once, rather than following the "Next page"
+# button one page at a time.
+SEARCH_PAGE_FAN_OUT = True
+
+# Number of search results to request per search page. Larger pages mean fewer
+# pages to render per set. Set to 0 to use the site's default page size.
+SEARCH_PAGE_SIZE = 0
+
+# How the high price of a card is found:
+#   "last_page"     - Open the card's details page, then navigate to its last
+#                     listings page in a second request (the original flow).
+#   "single_visit"  - Click through to the last listings page inside the
+#                     browser during the first visit, and wait until its
+#                     listings replace the first page's. Halves the number of
+#                     page loads; cards that fail fall back to "last_page".
+HIGH_PRICE_MODE = "last_page"
+
+# Whether to keep an on-disk index of scraped cards. When enabled, cards that
+# were scraped less than CARD_INDEX_TTL seconds ago are emitted from the index
+# instead of having their details pages visited again.
+CARD_INDEX_ENABLED = False
+
+CARD_INDEX_PATH = "./out/card_index.sqlite3"
+
+# Maximum age, in seconds, of an indexed card before it is scraped again.
+CARD_INDEX_TTL = 12 * 60 * 60
+
+# Whether to skip the details pages of cards whose low and market prices on the
+# search grid are unchanged since they were last scraped. Their details are
+# carried forward from the card index and marked as reused. Requires
+# CARD_INDEX_ENABLED.
+CHANGE_DETECTION_ENABLED = False
+
+# Maximum age, in seconds, of carried-forward details before a card is scraped
+# again even if its search grid prices haven't moved.
+CHANGE_DETECTION_MAX_AGE = 7 * 24 * 60 * 60
+
+# Request priorities. Finishing cards that are already in progress comes before
+# expanding more search pages, so that cards are scraped depth first.
+SEARCH_PAGE_PRIORITY = 0
+FIRST_DETAILS_PAGE_PRIORITY = 10
+LAST_DETAILS_PAGE_PRIORITY = 20
+
+# Maximum number of cards whose details pages are in progress at once. Further
+# cards and search pages are held back until some of them finish. Set to 0 for
+# no limit. The peak is reported in the pokespider/wip/max stat.
+MAX_WIP_CARDS = 64
+
+# Whether to read the fields of details pages inside the browser and only send
+# them back as JSON, instead of serialising and re-parsing the whole page.
+# tests/test_extract_parity.py checks that both give the same fields; run it
+# with a browser installed before turning this on.
+EXTRACT_IN_BROWSER = False
+
+# Which subrequests are sent through the download handler's route callback:
+#   None            - every subrequest (required for PLAYWRIGHT_BLOCK_POLICY and
+#                     PLAYWRIGHT_ABORT_REQUEST to see them).
+#   "navigation"    - only the page's own navigation request, unless a block or
+#                     abort policy or the subresource cache applies to the
+#                     request, or PLAYWRIGHT_PROCESS_REQUEST_HEADERS is set
+#                     (by default it is, to give subrequests Scrapy's headers).
+#   [patterns]      - the navigation request plus the given URL globs/regexes.
+#                     Subrequests that don't match are never blocked, aborted
+#                     or cached.
+# Both conflict with this project's block presets (PLAYWRIGHT_BLOCK_POLICY_PRESETS)
+# and headers: "navigation" is overridden and intercepts everything, and the
+# patterns limit blocking and caching to what they match. A warning is logged
+# when either happens. See benchmarks/route_overhead.py for the cost per
+# intercepted subrequest.
+PLAYWRIGHT_ROUTE_FILTER = None
+
+# Number of idle pages kept open per browser context to be reused by later
+# requests, instead of opening and closing a page for every request. Pages are
+# reset to about:blank between requests, retired after
+# PLAYWRIGHT_PAGE_POOL_MAX_USES uses (0 for no limit), and checked before reuse
+# when PLAYWRIGHT_PAGE_POOL_HEALTH_CHECK is enabled. Set the size to 0 to
+# disable the pool.
+PLAYWRIGHT_PAGE_POOL_SIZE = 8
+PLAYWRIGHT_PAGE_POOL_MAX_USES = 50
+PLAYWRIGHT_PAGE_POOL_HEALTH_CHECK = True
+
+# Number of browser processes to run. Requests that don't name a context are
+# spread over one default context per browser ("default-0", "default-1", ...),
+# so cookies are not shared between them. Other contexts are placed on the
+# browser with the fewest pages in use ("least_loaded") or in turn
+# ("round_robin"). Page counts per browser are reported under
+# playwright/browser/<index>/.
+PLAYWRIGHT_BROWSER_POOL_SIZE = 1
+PLAYWRIGHT_BROWSER_POOL_STRATEGY = "least_loaded"
+
+# Retire and replace a browser context after it has handed out this many pages,
+# or when the Playwright processes use more than PLAYWRIGHT_CONTEXT_MAX_RSS_MB
+# (checked every PLAYWRIGHT_CONTEXT_RSS_CHECK_INTERVAL seconds, needs psutil).
+# Retired contexts finish their in-flight pages before they are closed. Keep the
+# RSS limit below MEMUSAGE_LIMIT_MB so contexts are recycled before the crawl is
+# stopped. 0 disables either limit.
+PLAYWRIGHT_CONTEXT_MAX_PAGES = 500
+PLAYWRIGHT_CONTEXT_MAX_RSS_MB = 0
+PLAYWRIGHT_CONTEXT_RSS_CHECK_INTERVAL = 30
+
+
+# Serve static subresources (scripts, stylesheets, fonts, images) of rendered
+# pages from a local cache with route.fulfill, so new browser contexts don't
+# download the same bundles again. Responses are cached for as long as their
+# Cache-Control/Expires headers allow, or PLAYWRIGHT_SUBRESOURCE_CACHE_DEFAULT_TTL
+# seconds if they have neither (0 to not cache them). The least recently used
+# entries are evicted past the memory and disk limits; set the directory to
+# None to only cache in memory. Hits and bytes saved are reported under
+# playwright/subresource_cache/.
+PLAYWRIGHT_SUBRESOURCE_CACHE_ENABLED = True
+PLAYWRIGHT_SUBRESOURCE_CACHE_DIR = "./out/.subresource_cache"
+PLAYWRIGHT_SUBRESOURCE_CACHE_MEMORY_MB = 64
+PLAYWRIGHT_SUBRESOURCE_CACHE_DISK_MB = 512
+PLAYWRIGHT_SUBRESOURCE_CACHE_RESOURCE_TYPES = ["script", "stylesheet", "font", "image"]
+PLAYWRIGHT_SUBRESOURCE_CACHE_DEFAULT_TTL = 0
+
+# Record the rendered responses of a crawl to an archive, or replay them without
+# launching a browser, e.g. to benchmark or regression-test the spider and the
+# pipeline offline:
+#   None        - normal crawl.
+#   "record"    - crawl normally and write every rendered response (URL, headers,
+#                 body and the meta keys below) to PLAYWRIGHT_ARCHIVE_PATH.
+#   "replay"    - serve rendered requests from the archive. Requests that were
+#                 not recorded fail with IgnoreRequest. Set DOWNLOAD_DELAY = 0
+#                 and AUTOTHROTTLE_ENABLED = False to replay at full speed.
+# Responses are looked up by method, URL and the meta keys in
+# PLAYWRIGHT_ARCHIVE_KEY_META_KEYS, since those change what a page renders to.
+PLAYWRIGHT_ARCHIVE_MODE = None
+PLAYWRIGHT_ARCHIVE_PATH = "./out/response_archive.jsonl.gz"
+PLAYWRIGHT_ARCHIVE_KEY_META_KEYS = ["playwright_extract", "high_price_in_page"]
+
+# Sample the RSS of the Scrapy process and of the Playwright driver, browser and
+# content (renderer) processes every PLAYWRIGHT_MEMORY_SAMPLER_INTERVAL seconds,
+# to see which of them grows during long runs. Needs psutil. The peak, last
+# value and growth of each are reported under memory_sampler/, and the series
+# is written to PLAYWRIGHT_MEMORY_SAMPLER_CSV (None to skip it). The process
+# tree is listed again every PLAYWRIGHT_MEMORY_SAMPLER_TREE_REFRESH_INTERVAL
+# seconds, or sooner if a process exits.
+PLAYWRIGHT_MEMORY_SAMPLER_ENABLED = True
+PLAYWRIGHT_MEMORY_SAMPLER_INTERVAL = 5
+PLAYWRIGHT_MEMORY_SAMPLER_CSV = "./out/memory_samples.csv"
+PLAYWRIGHT_MEMORY_SAMPLER_TREE_REFRESH_INTERVAL = 10
+
+# Soft memory limit, below MEMUSAGE_LIMIT_MB. While the current RSS of Scrapy and
+# the Playwright processes is above it, the pages in use per browser context are
+# halved on every MEMUSAGE_CHECK_INTERVAL_SECONDS check, and doubled back once
+# the RSS falls below PLAYWRIGHT_MEMUSAGE_SOFT_LIMIT_RESUME_RATIO times the soft
+# limit, so long runs slow down instead of being stopped at the hard limit.
+# Throttling is reported under memusage/soft_limit/. 0 disables it.
+PLAYWRIGHT_MEMUSAGE_SOFT_LIMIT_MB = 0
+PLAYWRIGHT_MEMUSAGE_SOFT_LIMIT_RESUME_RATIO = 0.9
+
+# Tune the pages in use per browser context at runtime instead of relying on a
+# fixed PLAYWRIGHT_MAX_PAGES_PER_CONTEXT, which becomes the ceiling (and
+# CONCURRENT_REQUESTS/CONCURRENT_REQUESTS_PER_DOMAIN still cap downloads). After
+# every PLAYWRIGHT_AUTOTUNE_WINDOW downloads the limit is cut by 30% if the
+# error/timeout rate is above PLAYWRIGHT_AUTOTUNE_MAX_ERROR_RATE, the median
+# download latency of a request kind (search, first_details, ...) is over
+# PLAYWRIGHT_AUTOTUNE_LATENCY_FACTOR times the best seen so far for that kind, or
+# the 1-minute load per core is above PLAYWRIGHT_AUTOTUNE_MAX_LOAD.
+# Otherwise it grows by one page while the contexts are using all of theirs.
+# Decisions are logged and counted under playwright/autotune/.
+PLAYWRIGHT_AUTOTUNE_ENABLED = False
+PLAYWRIGHT_AUTOTUNE_INITIAL_PAGES = 4
+PLAYWRIGHT_AUTOTUNE_MIN_PAGES = 1
+PLAYWRIGHT_AUTOTUNE_WINDOW = 20
+PLAYWRIGHT_AUTOTUNE_MAX_ERROR_RATE = 0.1
+PLAYWRIGHT_AUTOTUNE_LATENCY_FACTOR = 2.0
+PLAYWRIGHT_AUTOTUNE_MAX_LOAD = 1.5
+
+# Time each stage of a request into latency histograms per request kind
+# (set_selector, search, first_details, last_details, and item for the CSV
+# export): page_creation, goto, wait_for_selectors, page_methods, content or
+# extract, encode_body and download in the download handler, parse in the
+# spider, and export and flush in the CSV writer. Percentiles are added to the crawl stats under latency/<kind>/<stage>/
+# when the spider closes, with the raw buckets if LATENCY_HISTOGRAMS_DUMP_BUCKETS
+# is enabled. While crawling, print(latency.table()) in the telnet console shows
+# them live.
+LATENCY_HISTOGRAMS_ENABLED = True
+LATENCY_HISTOGRAMS_DUMP_BUCKETS = False
+
+# Parse search and details pages in a pool of workers instead of in the spider
+# callbacks, which run on the same event loop as Playwright, so that parsing
+# large pages doesn't stall the other open pages and can use more than one core.
+# Only the extracted fields are sent back to the spider. Details pages read in
+# the browser (EXTRACT_IN_BROWSER) are left alone.
+#   PARSE_POOL_TYPE - "process" or "thread". Threads avoid sending the pages to
+#                     other processes, but only overlap while lxml is parsing.
+#   PARSE_POOL_SIZE - Number of workers. 0 for one per CPU.
+# The time pages wait for a free worker is reported under
+# pokespider/parse_pool/queue_delay/ and in the parse_queue latency histograms.
+PARSE_POOL_ENABLED = False
+PARSE_POOL_TYPE = "process"
+PARSE_POOL_SIZE = 0
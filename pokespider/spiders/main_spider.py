@@ -12,21 +12,111 @@
 #      available to the CSV files
 #===============================================================================
 
-from scrapy import Spider, Request, Selector
+from scrapy import Spider, Request, signals
+from scrapy.exceptions import DontCloseSpider
 
+from pokespider.card_index import CardIndex
 from pokespider.items import PokespiderItem
+from pokespider.details_page import extract_details_page
+from pokespider.search_grid import extract_search_page
+from pokespider.set_catalog import SetCatalog
 
 from scrapy_playwright.page import PageMethod
+from scrapy_playwright.timing import get_latency_histograms
 
-import logging
+from w3lib.url import add_or_replace_parameter
+
+from collections import deque
 
-import wx
-import wx.lib.scrolledpanel
+import functools
+import logging
+import math
+import re
+
+SEARCH_URL = "https://www.tcgplayer.com/search/pokemon/product?productLineName=pokemon&page=1&view=grid"
+
+# Clicks the last link in the listings pagination bar of a details page. Used to
+# read the highest listing price without navigating to a second page. The first
+# page's listings are remembered so LAST_LISTINGS_PAGE_LOADED_SCRIPT can tell
+# when they have been replaced, or set to null if there is no other page.
+LAST_LISTINGS_PAGE_SCRIPT = """() => {
+    const links = document.querySelectorAll('.tcg-pagination__pages a');
+    const prices = document.querySelectorAll('.listing-item__price');
+    window.__pokespiderFirstListings = links.length > 1
+        ? Array.from(prices, price => price.textContent).join('|')
+        : null;
+    if (links.length > 1) {
+        links[links.length - 1].click();
+    }
+}"""
+
+# Waited on after LAST_LISTINGS_PAGE_SCRIPT, until the last page's listings are
+# shown. Works whether the click changes the listings in place or navigates to
+# a new document, in which case the remembered listings are gone.
+LAST_LISTINGS_PAGE_LOADED_SCRIPT = """() => {
+    const firstListings = window.__pokespiderFirstListings;
+    if (firstListings === null) {
+        return true;
+    }
+    const prices = document.querySelectorAll('.listing-item__price');
+    const listings = Array.from(prices, price => price.textContent).join('|');
+    return listings.length > 0 && listings !== firstListings;
+}"""
+
+# Fields of an item that are only available from a card's details pages, and
+# that are carried forward when a card's search grid prices haven't changed.
+DETAILS_PAGE_FIELDS = [
+    "market_price",
+    "median_price",
+    "high_price",
+    "foil_market_price",
+    "foil_median_price",
+    "has_normals",
+    "has_foils",
+]
+
+# The fields of DETAILS_PAGE_SELECTORS as an extraction spec that is run inside
+# the browser when EXTRACT_IN_BROWSER is enabled, so that only these values are
+# sent back.
+DETAILS_PAGE_EXTRACT_SPEC = {
+    "headers":          {"selector": ".price-points__header__price *", "all": True, "own_text": True},
+    "prices":           {"selector": ".price-points .price", "all": True, "own_text": True},
+    "pagination_urls":  {"selector": ".tcg-pagination__pages a", "all": True, "attribute": "href"},
+    "listing_prices":   {"selector": ".listing-item__price", "all": True, "own_text": True},
+}
+
+def timed_callback(kind):
+    """
+    Times a generator callback into the "parse" latency histogram of the passed
+    request kind, counting only the time spent inside the callback.
+
+    Parameters
+    ----------
+    kind : str
+        The request kind, the same as the request_kind meta key of the requests
+        the callback parses.
+    """
+
+    def decorator(callback):
+        @functools.wraps(callback)
+        def wrapper(self, response):
+            histograms = get_latency_histograms(self.crawler)
+            if histograms is None:
+                return callback(self, response)
+            return histograms.timed_generator(kind, "parse", callback(self, response))
+        return wrapper
+
+    return decorator
 
 class SelectionWindow:
     id_base = 1000
 
     def __init__(self, set_names = None, grid_width = 4):
+        # wxPython is only needed when the window is actually shown, so don't
+        # make headless runs pay for importing it.
+        import wx
+        import wx.lib.scrolledpanel
+
         self.app = wx.App()
         self.window = wx.Frame(None, title="Select your sets")
 
@@ -76,16 +166,137 @@ class MainSpider(Spider):
 
     name = "main"
 
-    def __init__(self):
-        pass
+    def __init__(self, *args, sets = None, sets_file = None, **kwargs):
+        """
+        Parameters
+        ----------
+        self : MainSpider
+            A referenece to the object that this method is being called on
+        sets : str
+            Semicolon separated list of sets to scrape, e.g. passed with
+            `scrapy crawl main -a sets="Set A;Set B"`. Takes priority over the
+            set selection window and the DEFAULT_SET_LIST setting.
+        sets_file : str
+            Path of a file listing the sets to scrape, one per line. Overrides
+            the SET_LIST_FILE setting.
+        """
+
+        super().__init__(*args, **kwargs)
+        self.card_index = None
+
+        self.sets_arg = sets
+        self.sets_file = sets_file
+
+        # Number of cards whose details pages have been requested but not yet
+        # finished, and the requests held back while that is at MAX_WIP_CARDS.
+        self.wip_count = 0
+        self.deferred_cards = deque()
+        self.deferred_search_pages = deque()
+
+        # Search grid prices of the cards being scraped, keyed by first_url, so
+        # that they can be stored in the card index once the card is finished.
+        self.search_prices = {}
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        spider.card_index = CardIndex.from_settings(crawler.settings)
+        crawler.signals.connect(spider.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(spider.spider_idle, signal=signals.spider_idle)
+        crawler.signals.connect(spider.spider_error, signal=signals.spider_error)
+        crawler.signals.connect(spider.request_dropped, signal=signals.request_dropped)
+        return spider
+
+    def spider_closed(self, spider):
+        if self.card_index is not None:
+            self.card_index.close()
+
+        # Every card that was started should have been finished, failed or
+        # dropped by now. Anything left is a leaked WIP slot.
+        if self.wip_count != 0:
+            self.log(f"{self.wip_count} cards were still counted as in progress at close",
+                level=logging.WARNING)
+            self.crawler.stats.set_value("pokespider/wip/leaked", self.wip_count)
+
+    def spider_idle(self, spider):
+        # Requests held back by the WIP cap aren't known to the scheduler, so
+        # don't let the spider close while there are any left.
+        if self.deferred_cards or self.deferred_search_pages:
+            self.release_deferred(force = True)
+            raise DontCloseSpider
+
+    def request_dropped(self, request, spider):
+        # A details page request dropped by the scheduler (e.g. by the
+        # dupefilter) never reaches a callback or errback, so its card has to
+        # be ended here or it would hold its WIP slot for the rest of the crawl.
+        if 'wip_item' in request.meta:
+            self.search_prices.pop(request.meta['wip_item'].get('first_url'), None)
+            self.end_card()
+
+    def spider_error(self, failure, response, spider):
+        # A card whose details page failed to parse will never be finished, so
+        # stop counting it as in progress.
+        if 'wip_item' in response.meta:
+            self.end_card()
 
     def start_requests(self):
         """Returns a list of requests that scrapy will process for the start of the spider. 
         """
 
-        url = "https://www.tcgplayer.com/search/pokemon/product?productLineName=pokemon&page=1&view=grid"
-        
-        yield self.request_set_selector(url)
+        # With a fresh set catalog on disk we can go straight to the search
+        # pages of the selected sets, without rendering the set selector.
+        catalog = SetCatalog.load_fresh(
+            self.settings.get("SET_CATALOG_PATH"), self.settings.getfloat("SET_CATALOG_TTL")
+        )
+        if catalog is not None:
+            # A configured set missing from the catalog may have been released
+            # since it was cached, so read the catalog from the site again.
+            missing_sets = [name for name in self.get_configured_sets() or [] if name not in catalog]
+
+            if missing_sets:
+                self.log(f"Sets missing from the cached set catalog, refreshing it: {missing_sets}",
+                    level=logging.INFO)
+                self.crawler.stats.set_value("pokespider/set_catalog/refreshed", True)
+            else:
+                self.log(f"Using cached set catalog with {len(catalog.names())} sets", level=logging.INFO)
+                self.crawler.stats.set_value("pokespider/set_catalog/cached", True)
+                yield from self.request_selected_sets(catalog, self.settings.get("SEARCH_URL", SEARCH_URL))
+                return
+
+        yield self.request_set_selector(self.settings.get("SEARCH_URL", SEARCH_URL))
+
+    def get_configured_sets(self):
+        """
+        Returns the sets chosen without the selection window: from the `sets`
+        spider argument, a set list file, or the DEFAULT_SET_LIST setting.
+
+        Parameters
+        ----------
+        self : MainSpider
+            A referenece to the object that this method is being called on
+
+        Returns
+        -------
+        list or None
+            The configured set names, or None if the user should pick the sets
+            in the set selection window.
+        """
+
+        if self.sets_arg:
+            return [name.strip() for name in self.sets_arg.split(";") if name.strip()]
+
+        sets_file = self.sets_file or self.settings.get("SET_LIST_FILE")
+        if sets_file:
+            with open(sets_file, "r", encoding="utf-8") as file:
+                return [
+                    line.strip() for line in file
+                    if line.strip() and not line.strip().startswith("#")
+                ]
+
+        if self.settings.getbool("USE_SET_SELECTION_WINDOW"):
+            return None
+
+        return self.settings.getlist("DEFAULT_SET_LIST")
 
     def get_set_selection(self, set_names):
         
@@ -98,6 +309,81 @@ class MainSpider(Spider):
         return selected_items
 
 
+#===============================================================================
+# WORK-IN-PROGRESS LIMITING
+#
+# Cards are scraped depth first: details pages have a higher priority than
+# search pages, and at most MAX_WIP_CARDS cards are in progress at once. Any
+# more card or search page requests are held back until cards finish.
+#===============================================================================
+
+    def schedule(self, request, starts_card = False):
+        """
+        Yields the passed request, unless the WIP cap has been reached, in
+        which case it is held back until enough cards have finished.
+
+        Parameters
+        ----------
+        self : MainSpider
+            A referenece to the object that this method is being called on
+        request : Scrapy.Request
+            A search page or first details page request.
+        starts_card : bool
+            Whether the request starts a new card.
+        """
+
+        max_wip_cards = self.settings.getint("MAX_WIP_CARDS")
+
+        if max_wip_cards > 0 and self.wip_count >= max_wip_cards:
+            if starts_card:
+                self.deferred_cards.append(request)
+            else:
+                self.deferred_search_pages.append(request)
+
+            self.crawler.stats.inc_value("pokespider/wip/deferred")
+            return
+
+        if starts_card:
+            self.start_card()
+
+        yield request
+
+    def start_card(self):
+        self.wip_count += 1
+        self.crawler.stats.max_value("pokespider/wip/max", self.wip_count)
+
+    def end_card(self):
+        self.wip_count = max(0, self.wip_count - 1)
+        self.release_deferred()
+
+    def release_deferred(self, force = False):
+        """
+        Sends held back requests to the engine while there is room under the
+        WIP cap. Cards go first, and a search page is only expanded once there
+        are no held back cards left.
+
+        Parameters
+        ----------
+        self : MainSpider
+            A referenece to the object that this method is being called on
+        force : bool
+            Release at least one request even if the cap is reached.
+        """
+
+        max_wip_cards = self.settings.getint("MAX_WIP_CARDS")
+
+        def has_room():
+            return max_wip_cards <= 0 or self.wip_count < max_wip_cards
+
+        while self.deferred_cards and (has_room() or force):
+            self.start_card()
+            self.crawler.engine.crawl(self.deferred_cards.popleft())
+            force = False
+
+        if self.deferred_search_pages and (has_room() or force):
+            self.crawler.engine.crawl(self.deferred_search_pages.popleft())
+
+
 #===============================================================================
 # PAGE REQUEST METHODS
 # 
@@ -109,6 +395,7 @@ class MainSpider(Spider):
     def set_name_to_url_param(self, set_name):
         """
         Converts the name of a set to the URL parameter that is used to query it.
+        Only used when the set filter doesn't give the exact slug of a set.
 
         Parameters
         ----------
@@ -126,14 +413,13 @@ class MainSpider(Spider):
         working_str = working_str.replace("&", "and")
         working_str = working_str.lower()
         working_str = working_str.replace(" ", "-")
-        url_param = f"setName={working_str}"
-        # TODO: Replace parenthesis
-        return url_param
+        return working_str
 
+    @timed_callback("set_selector")
     def parse_set_selector(self, response):
         """
-        Parses the card set filter on the search page, or the default list of 
-        sets to scrape. Used for creating the set selector window. 
+        Parses the card set filter on the search page into the set catalog,
+        caches it on disk and requests the search pages of the selected sets.
 
         Parameters
         ----------
@@ -143,37 +429,95 @@ class MainSpider(Spider):
             The search page that we a parsing. 
         """
 
-        # Fetch the list of sets that TCGPlayer.com has listed. 
-        site_set_names = response.css("[data-testid=searchFilterSet] * .tcg-input-checkbox__label-text::text").getall()
-        selected_sets = []
+        catalog = self.parse_set_catalog(response)
+        catalog.save(self.settings.get("SET_CATALOG_PATH"))
+
+        yield from self.request_selected_sets(catalog, self.settings.get("SEARCH_URL", SEARCH_URL), response)
+
+    def parse_set_catalog(self, response):
+        """
+        Reads the name and URL slug of every set listed in the set filter of
+        the search page.
+
+        Parameters
+        ----------
+        self : MainSpider
+            A referenece to the object that this method is being called on
+        Response :  Scrapy.Response
+            The search page that we a parsing. 
+
+        Returns
+        -------
+        SetCatalog
+            The sets listed on TCGPlayer.com.
+        """
+
+        sets = {}
+
+        # The value of each filter checkbox is the slug the site itself uses in
+        # the setName parameter. Fall back to rewriting the name if it's absent.
+        for checkbox in response.css("[data-testid=searchFilterSet] .tcg-input-checkbox"):
+            set_name = checkbox.css(".tcg-input-checkbox__label-text::text").get()
+            if set_name is None:
+                continue
 
-        # If we are not using the set selection window, add all the sets in the
-        # DEFAULT_SET_LIST setting, but double check that they actually exist on
-        # the site before adding it. Otherwise, use the list we scraped off of 
-        # the search page.
-        if not self.settings.getbool("USE_SET_SELECTION_WINDOW"):
-            for item in self.settings.getlist("DEFAULT_SET_LIST"):
-                if item not in site_set_names:
+            slug = checkbox.css("input::attr(value)").get()
+            sets[set_name] = slug or self.set_name_to_url_param(set_name)
+
+        if not sets:
+            site_set_names = response.css("[data-testid=searchFilterSet] * .tcg-input-checkbox__label-text::text").getall()
+            sets = {set_name: self.set_name_to_url_param(set_name) for set_name in site_set_names}
+
+        return SetCatalog(sets)
+
+    def request_selected_sets(self, catalog, root_url, response = None):
+        """
+        Works out which sets to scrape and creates a request for the first
+        search page of each one.
+
+        Parameters
+        ----------
+        self : MainSpider
+            A referenece to the object that this method is being called on
+        catalog : SetCatalog
+            The sets listed on TCGPlayer.com.
+        root_url : str
+            The URL of the search page to add the set parameter to.
+        response : Scrapy.Response
+            The response that the URL was parsed from, if any.
+        """
+
+        selected_sets = []
+        configured_sets = self.get_configured_sets()
+
+        # If the sets were configured up front, double check that they actually
+        # exist on the site before adding them. Otherwise, let the user choose
+        # from the list of sets in the catalog.
+        if configured_sets is not None:
+            for item in configured_sets:
+                if item not in catalog:
                     message = f"Set {item} does not exist on TCGPlayer.com!" + \
                         "Skipping"
                     self.log(message, level = logging.WARNING)
                 else:
                     selected_sets.append(item)
         else:
-            set_names = site_set_names
-            selected_sets = self.get_set_selection(set_names)
+            selected_sets = self.get_set_selection(catalog.names())
+
+        # A larger page size means fewer search pages to render per set.
+        page_size = self.settings.getint("SEARCH_PAGE_SIZE")
+        if page_size > 0:
+            root_url = add_or_replace_parameter(root_url, "pageSize", str(page_size))
 
         # Loop through all our selected sets and create a request for each one. 
-        root_url = response.url
         for set_name in selected_sets:
-            url_param = self.set_name_to_url_param(set_name)
-
-            url = f"{root_url}&{url_param}"
+            url = add_or_replace_parameter(root_url, "setName", catalog.slug(set_name))
 
-            meta = { "card_set": set_name }
+            meta = { "card_set": set_name, "search_page_number": 1 }
 
-            yield self.request_search_page(url, response, meta=meta)
+            yield from self.schedule(self.request_search_page(url, response, meta=meta))
 
+    @timed_callback("search")
     def parse_search_page(self, response):
         """
         Parses a search result page. 
@@ -187,97 +531,259 @@ class MainSpider(Spider):
         """
 
         card_set = response.meta["card_set"]
+        page_number = response.meta.get("search_page_number", 1)
 
         self.log(f"Beginning parse of search page for set '{card_set}': {response.url}", level=logging.INFO)
 
-        # Find each of the search result panels in the page and parse them.
-        search_results = response.css(".search-result").getall()
-        for search_result in search_results:
-            item = self.parse_search_result(search_result)
+        fields = self.get_search_page_fields(response)
 
+        # Read all of the search result panels in the page in one go.
+        search_results = self.parse_search_results(fields['search_results'])
+        for item in search_results:
             url = item['first_url']
 
             item['first_url'] = self.get_absolute_url(url, response)
-            yield self.request_first_details_page(url, response, item)
 
-        next_page_url = response.xpath('.//a[@aria-label="Next page"]/@href').get()
+            # Cards scraped recently enough don't need their details pages
+            # visited again, so emit the indexed copy instead.
+            cached_item = self.get_cached_item(item['first_url'])
+            if cached_item is not None:
+                yield cached_item
+                continue
+
+            # Cards whose search grid prices haven't moved since the last run
+            # keep their previous details instead of being scraped again.
+            reused_item = self.get_reused_item(item)
+            if reused_item is not None:
+                yield reused_item
+                continue
+
+            self.search_prices[item['first_url']] = (item['low_price'], item['market_price'])
+            yield from self.schedule(self.request_first_details_page(url, response, item), starts_card = True)
+
+        # Pages requested by the fan-out below are already accounted for, so
+        # they must not follow the next-page button as well.
+        if response.meta.get("search_fanned_out"):
+            return
+
+        # On the first page of a set, read how many pages there are and request
+        # all of them at once instead of walking the next-page chain serially.
+        if page_number == 1 and self.settings.getbool("SEARCH_PAGE_FAN_OUT"):
+            page_count = self.get_search_page_count(fields, len(search_results))
+
+            if page_count == 1:
+                self.log(f"Done parsing card set '{card_set}'", level=logging.INFO)
+                return
+
+            if page_count is not None:
+                self.log(f"Fanning out {page_count - 1} search pages for set '{card_set}'", level=logging.INFO)
+                self.crawler.stats.inc_value("pokespider/search_pages/fanned_out", page_count - 1)
+
+                for next_page_number in range(2, page_count + 1):
+                    next_page_url = add_or_replace_parameter(response.url, "page", str(next_page_number))
+                    meta = {
+                        "card_set": card_set,
+                        "search_page_number": next_page_number,
+                        "search_fanned_out": True,
+                    }
+                    yield from self.schedule(self.request_search_page(next_page_url, response, meta=meta))
+                return
+
+        next_page_url = fields['next_page_url']
 
         # If we have a url from the next-page button, parse it. Otherwise, we
         # know that we have reached the last search page and can finish.
         if next_page_url is not None:
-            meta = {"card_set": card_set}
-            yield self.request_search_page(next_page_url, response, meta=meta)
+            meta = {"card_set": card_set, "search_page_number": page_number + 1}
+            yield from self.schedule(self.request_search_page(next_page_url, response, meta=meta))
         else:
             self.log(f"Done parsing card set '{card_set}'", level=logging.INFO)
 
-    def parse_search_result(self, search_result_body):
+    def get_cached_item(self, first_url):
         """
-        Parses a search result panel for a singular card, from the search page. 
+        Looks up a card in the card index.
 
         Parameters
         ----------
         self : MainSpider
             A referenece to the object that this method is being called on
-        Response :  Scrapy.Response
-            The contents of the search result panel that we are parsing details
-            from. 
+        first_url : str
+            The absolute product URL of the card.
+
+        Returns
+        -------
+        PokespiderItem or None
+            The indexed item if it is still fresh under CARD_INDEX_TTL, or None
+            if the card has to be scraped.
         """
 
-        selector = Selector(text=search_result_body)
+        if self.card_index is None:
+            return None
 
-        card_series = selector.css(".product-card__subtitle::text").get()  \
-            .replace(": ", " - ")
+        fields = self.card_index.get_fresh(first_url, self.settings.getfloat("CARD_INDEX_TTL"))
+        if fields is None:
+            self.crawler.stats.inc_value("pokespider/card_index/miss")
+            return None
 
-        rarity_spans = selector.css(".product-card__rarity span")
+        self.crawler.stats.inc_value("pokespider/card_index/hit")
+        return PokespiderItem(**{key: value for key, value in fields.items() if key in PokespiderItem.fields})
 
-        self.log(f"parse_search_result:\n    rarity_spans: {rarity_spans}")
+    def get_reused_item(self, item):
+        """
+        Compares the search grid prices of a card against the card index, and
+        carries the previous details forward if they haven't changed.
 
-        card_rarity = None
+        Parameters
+        ----------
+        self : MainSpider
+            A referenece to the object that this method is being called on
+        item : PokespiderItem
+            The item parsed from the search grid.
 
-        # If this card doesn't have a rarity associated with it. Skip it because 
-        # it's a pack of some sort we don't care about
-        if len(rarity_spans) > 0:
-            card_rarity = rarity_spans[0].css("span::text").get()
+        Returns
+        -------
+        PokespiderItem or None
+            The item with its details-page fields filled in from the index and
+            marked as reused, or None if the card has to be scraped.
+        """
 
-        card_number = None
+        if self.card_index is None or not self.settings.getbool("CHANGE_DETECTION_ENABLED"):
+            return None
 
-        # Check that the search result card actually has a card number. 
-        # Occasionally, some promo cards aren't actually used in deck building
-        # and won't have a card number
-        if len(rarity_spans) >= 3:
-            card_number = rarity_spans[2].css("span::text").get()   \
-                .split('/')[0]                                      \
-                .strip("#")
-        
-        card_name = selector.css(".product-card__title::text").get()   \
-            .split('-')[0]                                              \
-            .strip()
-    
-        # Not actually the price with shipping. Some lazy-ass programmer didn't
-        # bother to rename the class.
-        minimum_price = selector.css(".inventory__price-with-shipping::text").get()
-
-        market_price = selector.css(".product-card__market-price--value::text").get()
-
-        first_url = selector.css("a::attr(href)").get()
-
-        return PokespiderItem(
-            first_url = first_url,
-            card_name = card_name,
-            card_order = card_number,
-            card_series = card_series,
-            card_rarity = card_rarity,
-            low_price = minimum_price,
-            market_price = market_price,
-            
-            high_price = None,
-            median_price = None,
-            foil_market_price = None,
-            foil_median_price = None,
-            has_normals = None,
-            has_foils = None,
+        search_prices = (item['low_price'], item['market_price'])
+        entry = self.card_index.get_unchanged(
+            item['first_url'], *search_prices, self.settings.getfloat("CHANGE_DETECTION_MAX_AGE")
         )
-    
+        if entry is None:
+            self.crawler.stats.inc_value("pokespider/change_detection/changed")
+            return None
+
+        fields, scraped_at = entry
+        for field in DETAILS_PAGE_FIELDS:
+            item[field] = fields.get(field)
+        item['reused'] = 'X'
+
+        # Keep the original scrape time so reused details still age out.
+        self.card_index.store(item, search_prices, scraped_at = scraped_at)
+
+        self.crawler.stats.inc_value("pokespider/change_detection/unchanged")
+        return item
+
+    def finish_item(self, item):
+        """
+        Records a fully scraped card in the card index and returns it.
+
+        Parameters
+        ----------
+        self : MainSpider
+            A referenece to the object that this method is being called on
+        item : PokespiderItem
+            The completed item.
+        """
+
+        search_prices = self.search_prices.pop(item['first_url'], None)
+
+        if self.card_index is not None:
+            self.card_index.store(item, search_prices)
+
+        self.end_card()
+
+        return item
+
+    def get_search_page_fields(self, response):
+        """
+        Reads the fields of a search page, either from the parse pool or by
+        parsing the rendered HTML.
+
+        Parameters
+        ----------
+        self : MainSpider
+            A referenece to the object that this method is being called on
+        Response :  Scrapy.Response
+            The search page that we are parsing.
+
+        Returns
+        -------
+        dict
+            The fields of the page, see search_grid.extract_search_page.
+        """
+
+        if 'parsed_fields' in response.meta:
+            return response.meta['parsed_fields']
+
+        return extract_search_page(response.selector.root)
+
+    def get_search_page_count(self, fields, results_on_page):
+        """
+        Works out how many search pages a set has from its first search page.
+
+        Parameters
+        ----------
+        self : MainSpider
+            A referenece to the object that this method is being called on
+        fields : dict
+            The fields of the first search page of a set.
+        results_on_page : int
+            The number of search results found on the first page. Only used as
+            the page size when SEARCH_PAGE_SIZE is not set.
+
+        Returns
+        -------
+        int or None
+            The total number of search pages, or None if it could not be found,
+            in which case the next-page button should be followed instead.
+        """
+
+        # Prefer the total result count from the results header, since the
+        # pagination bar only lists a window of page numbers on large sets.
+        # The requested page size is exact, while the number of results on the
+        # page may be short, e.g. if some of them failed to render in time.
+        page_size = self.settings.getint("SEARCH_PAGE_SIZE") or results_on_page
+
+        match = re.search(r"([\d,]+)\s+results?", fields['header_text'])
+        if match is not None and page_size > 0:
+            result_count = int(match.group(1).replace(",", ""))
+            return max(1, math.ceil(result_count / page_size))
+
+        if fields['page_numbers']:
+            return max(fields['page_numbers'])
+
+        return None
+
+    def parse_search_results(self, search_results):
+        """
+        Creates an item for every card on a search page.
+
+        Parameters
+        ----------
+        self : MainSpider
+            A referenece to the object that this method is being called on
+        search_results : list of dict
+            The search grid fields of each card on the page, see
+            search_grid.extract_search_results.
+
+        Returns
+        -------
+        list of PokespiderItem
+            An item for each card on the page, with only the fields shown in
+            the search grid filled in.
+        """
+
+        return [
+            PokespiderItem(
+                **fields,
+
+                high_price = None,
+                median_price = None,
+                foil_market_price = None,
+                foil_median_price = None,
+                has_normals = None,
+                has_foils = None,
+            )
+            for fields in search_results
+        ]
+
+    @timed_callback("first_details")
     def parse_first_details_page(self, response):
         """
         Parses the first details page for a specific card. 
@@ -293,10 +799,10 @@ class MainSpider(Spider):
         item = response.meta['wip_item']
 
         self.log(f"Parsing first details page for {item['first_url']}", level = logging.INFO)
-        
-        headers = response.css(".price-points__header__price *::text").getall()
 
-        headers = [h.strip() for h in headers]
+        fields = self.get_details_page_fields(response)
+        
+        headers = [h.strip() for h in fields['headers']]
         has_normal_prices = "Normal" in headers
         has_foil_prices = "Foil" in headers
 
@@ -305,7 +811,7 @@ class MainSpider(Spider):
 
         # Depending on whether this card has holofoils, normal cards or both,
         # we need to scrape and store the data slightly differently
-        prices = response.css(".price-points .price::text").getall()
+        prices = fields['prices']
         if has_normal_prices and has_foil_prices:
             item['market_price'] = prices[0]    
             item['foil_market_price'] = prices[1]
@@ -322,12 +828,55 @@ class MainSpider(Spider):
             item['foil_market_price'] = prices[0]
             item['foil_median_price'] = prices[2]
 
-        next_url = response.css('.tcg-pagination__pages a::attr(href)').getall()[-1]
+        # In single-visit mode the page was already moved to its last listings
+        # page in the browser, so the high price can be read right here.
+        if response.meta.get("high_price_in_page"):
+            listing_prices = fields['listing_prices']
+
+            if len(listing_prices) > 0:
+                item['high_price'] = listing_prices[-1]
+
+                self.log(f"Done Parsing First Details Page for {item['first_url']}", level = logging.INFO)
+
+                yield self.finish_item(item)
+                return
+
+            self.log(f"No listings found in single-visit mode for {item['first_url']}, " + \
+                "falling back to the last details page", level = logging.WARNING)
+
+        next_url = fields['pagination_urls'][-1]
 
         self.log(f"Done Parsing First Details Page for {item['first_url']}", level = logging.INFO)
 
         yield self.request_last_details_page(next_url, response, item)
 
+    def get_details_page_fields(self, response):
+        """
+        Reads the raw fields of a details page, either from the JSON extracted
+        inside the browser, from the parse pool or by parsing the rendered HTML.
+
+        Parameters
+        ----------
+        self : MainSpider
+            A referenece to the object that this method is being called on
+        Response :  Scrapy.Response
+            The response that we are parsing
+
+        Returns
+        -------
+        dict
+            The list of values for each field in DETAILS_PAGE_SELECTORS.
+        """
+
+        if response.meta.get("playwright_extract"):
+            return response.json()
+
+        if 'parsed_fields' in response.meta:
+            return response.meta['parsed_fields']
+
+        return extract_details_page(response.selector.root)
+
+    @timed_callback("last_details")
     def parse_last_details_page(self, response):
         """
         Parses the last details page for a specific card. 
@@ -344,13 +893,13 @@ class MainSpider(Spider):
 
         self.log(f"Parsing last details page for {item['first_url']}", level = logging.INFO)
         
-        listing_prices = response.css(".listing-item__price::text").getall();
+        listing_prices = self.get_details_page_fields(response)['listing_prices']
         
         item['high_price'] = listing_prices[-1]
         
         self.log(f"Done parsing last details page for {item['first_url']}", level = logging.INFO)
 
-        yield item
+        yield self.finish_item(item)
 
     def error_callback(self, failure):
         """
@@ -365,10 +914,25 @@ class MainSpider(Spider):
         """
         request = failure.request
 
+        # If moving to the last listings page inside the browser failed, retry
+        # the card with the two-visit flow rather than losing its details.
+        if request.meta.get("high_price_in_page") and 'wip_item' in request.meta:
+            self.log(f"Single-visit details page failed for {request.url}, " + \
+                "retrying with the last details page", level = logging.WARNING)
+            # The card stays counted as in progress until the retry finishes or
+            # fails, in which case this callback ends it below. The retry has
+            # the same URL as the failed request, so it must skip the dupefilter.
+            return self.request_first_details_page(
+                request.url, None, request.meta['wip_item'], high_price_mode = "last_page"
+            ).replace(dont_filter = True)
+
         try:
             item = request.meta['wip_item']
             item['error_encountered'] = failure.getErrorMessage()
 
+            self.search_prices.pop(item['first_url'], None)
+            self.end_card()
+
             return item
         except KeyError:
             self.logger.error("Could not return partial item from error callback")
@@ -432,10 +996,9 @@ class MainSpider(Spider):
         if meta is None:
             meta = {}
 
+        meta['request_kind'] = "set_selector"
         meta['playwright'] = True
-        meta['playwright_page_methods'] = [
-            PageMethod("wait_for_selector", "[data-testid=searchFilterSet]")
-        ]
+        meta['playwright_wait_for_selectors'] = ["[data-testid=searchFilterSet]"]
         
         new_url = self.get_absolute_url(url, response)
         self.log(f"Requesting set selector: {new_url}", level=logging.INFO)
@@ -474,10 +1037,10 @@ class MainSpider(Spider):
         if meta is None:
             meta = {}
 
+        meta['request_kind'] = "search"
         meta['playwright'] = True
-        meta['playwright_page_methods'] = [
-            PageMethod("wait_for_selector", ".search-results")
-        ]
+        meta['playwright_wait_for_selectors'] = [".search-results"]
+        meta['playwright_block_preset'] = "search"
 
         new_url = self.get_absolute_url(url, response)
 
@@ -486,10 +1049,11 @@ class MainSpider(Spider):
             url = new_url,
             callback = self.parse_search_page,
             errback = self.error_callback,
-            meta = meta
+            meta = meta,
+            priority = self.settings.getint("SEARCH_PAGE_PRIORITY"),
         )
     
-    def request_first_details_page(self, url, response, item, meta = None):
+    def request_first_details_page(self, url, response, item, meta = None, high_price_mode = None):
         """
         Requests a cards initial details page with a wait for necessary data to 
         appear. Handles whatever middleware-specific details are necessary.
@@ -505,6 +1069,8 @@ class MainSpider(Spider):
         meta : dict
             A dictionary that will be attached to the request and response, and 
             used by middlewares. 
+        high_price_mode : str
+            Overrides the HIGH_PRICE_MODE setting for this request.
 
         Returns
         -------
@@ -516,13 +1082,31 @@ class MainSpider(Spider):
         if meta is None:
             meta = {}
 
+        if high_price_mode is None:
+            high_price_mode = self.settings.get("HIGH_PRICE_MODE", "last_page")
+
         meta['wip_item'] = item
 
+        meta['request_kind'] = "first_details"
         meta['playwright'] = True
-        meta['playwright_page_methods'] = [
-            PageMethod("wait_for_selector", ".price-points"),
-            PageMethod("wait_for_selector", ".tcg-pagination__pages")
-        ]
+        meta['playwright_wait_for_selectors'] = [".price-points", ".tcg-pagination__pages"]
+        meta['playwright_block_preset'] = "details"
+        meta['playwright_page_methods'] = []
+
+        if self.settings.getbool("EXTRACT_IN_BROWSER"):
+            meta['playwright_extract'] = DETAILS_PAGE_EXTRACT_SPEC
+
+        # Click through to the last listings page inside the browser and wait
+        # for its listings to load, so the high price comes back with this
+        # response instead of needing a second navigation.
+        if high_price_mode == "single_visit":
+            meta['high_price_in_page'] = True
+            meta['playwright_page_methods'] += [
+                PageMethod("evaluate", LAST_LISTINGS_PAGE_SCRIPT, wait_for_load_state = False),
+                PageMethod("wait_for_function", LAST_LISTINGS_PAGE_LOADED_SCRIPT, wait_for_load_state = False),
+            ]
+        else:
+            meta.pop('high_price_in_page', None)
 
         new_url = self.get_absolute_url(url, response)
 
@@ -532,6 +1116,7 @@ class MainSpider(Spider):
             callback = self.parse_first_details_page,
             errback = self.error_callback,
             meta = meta,
+            priority = self.settings.getint("FIRST_DETAILS_PAGE_PRIORITY"),
         )
     
     def request_last_details_page(self, url, response, item, meta = None):
@@ -563,10 +1148,13 @@ class MainSpider(Spider):
 
         meta['wip_item'] = item
 
+        meta['request_kind'] = "last_details"
         meta['playwright'] = True
-        meta['playwright_page_methods'] = [
-            PageMethod("wait_for_selector", ".price-points"),
-        ]
+        meta['playwright_wait_for_selectors'] = [".price-points"]
+        meta['playwright_block_preset'] = "details"
+
+        if self.settings.getbool("EXTRACT_IN_BROWSER"):
+            meta['playwright_extract'] = DETAILS_PAGE_EXTRACT_SPEC
         
         new_url = self.get_absolute_url(url, response)
 
@@ -576,6 +1164,7 @@ class MainSpider(Spider):
             callback = self.parse_last_details_page,
             errback = self.error_callback,
             meta = meta,
+            priority = self.settings.getint("LAST_DETAILS_PAGE_PRIORITY"),
         )
 
         
\ No newline at end of file
@@ -1,5 +1,8 @@
+import asyncio
+import json
 import logging
-from typing import Awaitable, Iterator, Optional, Tuple, Union
+from collections import deque
+from typing import Awaitable, Deque, Iterator, Optional, Tuple, Union
 
 from playwright.async_api import Error, Page, Request, Response
 from scrapy import Spider
@@ -17,6 +20,59 @@ async def _maybe_await(obj):
     return obj
 
 
+class _ResizableSemaphore:
+    """Semaphore whose limit can be changed while it is in use. Lowering the limit
+    doesn't affect current holders, it only makes new acquire() calls wait until
+    enough of them have released it."""
+
+    def __init__(self, value: int) -> None:
+        self._limit = max(1, value)
+        self._in_use = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @property
+    def in_use(self) -> int:
+        return self._in_use
+
+    def locked(self) -> bool:
+        return self._in_use >= self._limit
+
+    async def acquire(self) -> bool:
+        while self._in_use >= self._limit:
+            waiter = asyncio.get_event_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif not waiter.cancelled():
+                    self._wake_up()  # pass on the slot this waiter was woken up for
+                raise
+        self._in_use += 1
+        return True
+
+    def release(self) -> None:
+        self._in_use -= 1
+        self._wake_up()
+
+    def set_limit(self, value: int) -> None:
+        self._limit = max(1, value)
+        self._wake_up()
+
+    def _wake_up(self) -> None:
+        free_slots = self._limit - self._in_use
+        while free_slots > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free_slots -= 1
+
+
 def _possible_encodings(headers: Headers, text: str) -> Iterator[str]:
     if headers.get("content-type"):
         content_type = to_unicode(headers["content-type"])
@@ -88,4 +144,53 @@ async def _get_header_value(
     try:
         return await resource.header_value(header_name)
     except Exception:
-        return None
\ No newline at end of file
+        return None
+
+
+# Runs an extraction spec inside the page. For each field, the spec gives a CSS
+# selector, whether to return all matches or only the first one, and whether to
+# read an attribute, the text nodes directly inside the matched elements (one
+# value per node, like parsel's ::text) or their full text.
+_EXTRACT_SCRIPT = """(spec) => {
+    const result = {};
+    for (const [field, options] of Object.entries(spec)) {
+        const nodes = options.all
+            ? Array.from(document.querySelectorAll(options.selector))
+            : [document.querySelector(options.selector)].filter((node) => node !== null);
+        let values;
+        if (options.own_text) {
+            // Like parsel's ::text, one value per non-empty text node directly
+            // inside a matched element, in document order.
+            values = nodes
+                .flatMap((node) => Array.from(node.childNodes))
+                .filter((child) => child.nodeType === Node.TEXT_NODE && child.nodeValue !== "")
+                .sort((a, b) =>
+                    a.compareDocumentPosition(b) & Node.DOCUMENT_POSITION_FOLLOWING ? -1 : 1)
+                .map((child) => child.nodeValue);
+        } else if (options.attribute) {
+            // like ::attr(), elements without the attribute give no value
+            values = nodes
+                .filter((node) => node.hasAttribute(options.attribute))
+                .map((node) => node.getAttribute(options.attribute));
+        } else {
+            values = nodes.map((node) => node.textContent);
+        }
+        result[field] = options.all ? values : (values.length > 0 ? values[0] : null);
+    }
+    return result;
+}"""
+
+
+def _normalize_extract_spec(spec: dict) -> dict:
+    """Fields given as a plain selector string return the full text of the first match."""
+    return {
+        field: {"selector": options} if isinstance(options, str) else dict(options)
+        for field, options in spec.items()
+    }
+
+
+async def _get_page_extraction(page: Page, spec: dict) -> str:
+    """Run an extraction spec (see the playwright_extract meta key) inside the page
+    and return the result serialised as JSON."""
+    result = await page.evaluate(_EXTRACT_SCRIPT, _normalize_extract_spec(spec))
+    return json.dumps(result)
@@ -0,0 +1,147 @@
+"""
+This module includes the archive used to record rendered responses and to replay
+them without a browser. Refer to the PLAYWRIGHT_ARCHIVE_* settings for more
+information.
+"""
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from scrapy.http import Request, Response, TextResponse
+from scrapy.http.headers import Headers
+from scrapy.responsetypes import responsetypes
+
+
+__all__ = ["ResponseArchive"]
+
+logger = logging.getLogger("scrapy-playwright")
+
+# meta keys set by the download handler, restored on the request when replaying
+DEFAULT_RESTORED_META_KEYS = (
+    "download_latency",
+    "redirect_times",
+    "redirect_urls",
+    "redirect_reasons",
+    "playwright_suggested_filename",
+)
+
+
+class ResponseArchive:
+    """Gzipped JSON lines file with one rendered response per line.
+
+    Responses are looked up by request method, URL and the values of key_meta_keys,
+    since the same URL renders to different bodies depending on e.g. the
+    playwright_extract or playwright_page_methods meta keys. The last recorded
+    response for a key wins.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        key_meta_keys: Iterable[str] = (),
+        restored_meta_keys: Iterable[str] = DEFAULT_RESTORED_META_KEYS,
+    ) -> None:
+        self.path = Path(path)
+        self.key_meta_keys = tuple(key_meta_keys)
+        self.restored_meta_keys = tuple(restored_meta_keys)
+        self._records: Dict[str, dict] = {}
+        self._file: Optional[gzip.GzipFile] = None
+        self._lock = threading.Lock()
+
+    def key(self, request: Request) -> str:
+        key_meta = {name: request.meta.get(name) for name in self.key_meta_keys}
+        fingerprint = json.dumps(
+            [request.method, request.url, key_meta], sort_keys=True, default=repr
+        )
+        return hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()
+
+    def open_for_recording(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = gzip.open(self.path, "wt", encoding="utf-8")
+
+    def record(self, request: Request, response: Response) -> None:
+        meta = {}
+        for name in (*self.key_meta_keys, *self.restored_meta_keys):
+            if name in request.meta:
+                try:
+                    json.dumps(request.meta[name])
+                except (TypeError, ValueError):
+                    continue  # e.g. PageMethod objects, which only matter for the key
+                meta[name] = request.meta[name]
+        record = {
+            "key": self.key(request),
+            "request_url": request.url,
+            "method": request.method,
+            "url": response.url,
+            "status": response.status,
+            "headers": {
+                key.decode("latin-1"): [value.decode("latin-1") for value in values]
+                for key, values in response.headers.items()
+            },
+            "body": base64.b64encode(response.body).decode("ascii"),
+            "encoding": response.encoding if isinstance(response, TextResponse) else None,
+            "flags": response.flags,
+            "meta": meta,
+        }
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._file is not None:
+                self._file.write(line)
+
+    def load(self) -> int:
+        """Read the archive into memory. Return the number of responses read."""
+        self._records.clear()
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as archive_file:
+                for line in archive_file:
+                    record = json.loads(line)
+                    self._records[record["key"]] = record
+        except FileNotFoundError:
+            logger.warning("Response archive %s does not exist", self.path)
+        except (EOFError, OSError, ValueError) as ex:
+            # an interrupted recording leaves a truncated last line or gzip trailer
+            logger.warning(
+                "Response archive %s is truncated (%s), keeping %i responses read so far",
+                self.path,
+                ex,
+                len(self._records),
+            )
+        return len(self._records)
+
+    def replay(self, request: Request) -> Optional[Response]:
+        """Build the recorded response for a request, or None if it was not recorded."""
+        record = self._records.get(self.key(request))
+        if record is None:
+            return None
+        for name in self.restored_meta_keys:
+            if name in record["meta"]:
+                request.meta[name] = record["meta"][name]
+        headers = Headers(record["headers"])
+        body = base64.b64decode(record["body"])
+        respcls = responsetypes.from_args(headers=headers, url=record["url"], body=body)
+        kwargs = {}
+        if record.get("encoding") and issubclass(respcls, TextResponse):
+            kwargs["encoding"] = record["encoding"]
+        return respcls(
+            url=record["url"],
+            status=record["status"],
+            headers=headers,
+            body=body,
+            request=request,
+            flags=[*record.get("flags", []), "replayed"],
+            **kwargs,
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __len__(self) -> int:
+        return len(self._records)
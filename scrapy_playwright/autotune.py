@@ -0,0 +1,138 @@
+"""
+This module includes the autotuner for the number of pages in use per browser
+context. Refer to the PLAYWRIGHT_AUTOTUNE_* settings for more information.
+"""
+import logging
+import os
+import statistics
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+__all__ = ["PageConcurrencyAutotuner"]
+
+logger = logging.getLogger("scrapy-playwright")
+
+
+@dataclass
+class _Window:
+    # latencies of the successful downloads, per request kind
+    latencies: Dict[Optional[str], List[float]] = field(default_factory=dict)
+    errors: int = 0
+    timeouts: int = 0
+    saturated: int = 0
+
+    @property
+    def count(self) -> int:
+        return sum(map(len, self.latencies.values())) + self.errors + self.timeouts
+
+
+class PageConcurrencyAutotuner:
+    """Adjusts the pages in use per context with additive increase, multiplicative
+    decrease (AIMD).
+
+    Downloads are observed in windows of window_size. After each window the limit
+    is multiplied by decrease_factor if the error or timeout rate is above
+    max_error_rate, the median latency of a request kind is more than latency_factor
+    times the lowest median seen so far for that kind, or the host load per core is
+    above max_load. Otherwise, if the contexts were using all of their pages for
+    most of the window, the limit is increased by one. A limit that isn't reached
+    can't be tuned by raising it.
+
+    Latencies are compared per kind (the request_kind meta key) because pages of
+    different kinds take very different times to render, so a window of mostly
+    slow kinds is not mistaken for an overloaded browser.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        window_size: int = 20,
+        max_error_rate: float = 0.1,
+        latency_factor: float = 2.0,
+        max_load: float = 1.5,
+        decrease_factor: float = 0.7,
+    ) -> None:
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(max(initial_limit, self.min_limit), self.max_limit)
+        self.window_size = window_size
+        self.max_error_rate = max_error_rate
+        self.latency_factor = latency_factor
+        self.max_load = max_load
+        self.decrease_factor = decrease_factor
+        # lowest median latency seen so far, per request kind
+        self.base_latencies: Dict[Optional[str], float] = {}
+        self._window = _Window()
+
+    def observe(
+        self,
+        latency: Optional[float] = None,
+        error: bool = False,
+        timeout: bool = False,
+        saturated: bool = False,
+        kind: Optional[str] = None,
+    ) -> Optional[int]:
+        """Record one download of a request kind. Return the new limit if it changed
+        at the end of a window."""
+        if timeout:
+            self._window.timeouts += 1
+        elif error or latency is None:
+            self._window.errors += 1
+        else:
+            self._window.latencies.setdefault(kind, []).append(latency)
+        if saturated:
+            self._window.saturated += 1
+        if self._window.count < self.window_size:
+            return None
+        window, self._window = self._window, _Window()
+        return self._evaluate(window)
+
+    def _evaluate(self, window: _Window) -> Optional[int]:
+        error_rate = (window.errors + window.timeouts) / window.count
+        slow_kind = None
+        for kind, latencies in window.latencies.items():
+            median_latency = statistics.median(latencies)
+            base_latency = self.base_latencies.setdefault(kind, median_latency)
+            if median_latency < base_latency:
+                self.base_latencies[kind] = median_latency
+            elif median_latency > base_latency * self.latency_factor and slow_kind is None:
+                slow_kind = (kind, median_latency, base_latency)
+        load = _get_load_per_core()
+
+        reason = None
+        if error_rate > self.max_error_rate:
+            reason = f"error rate {error_rate:.0%}"
+        elif slow_kind is not None:
+            kind, median_latency, base_latency = slow_kind
+            reason = (
+                f"median {kind or 'download'} latency {median_latency:.2f}s"
+                f" (base {base_latency:.2f}s)"
+            )
+        elif load is not None and load > self.max_load:
+            reason = f"load per core {load:.2f}"
+
+        old_limit = self.limit
+        if reason is not None:
+            self.limit = max(self.min_limit, int(self.limit * self.decrease_factor))
+        elif window.saturated * 2 >= window.count:
+            self.limit = min(self.max_limit, self.limit + 1)
+            reason = "contexts saturated"
+        if self.limit == old_limit:
+            return None
+        logger.info(
+            "Autotuner changed pages per context from %i to %i (%s)",
+            old_limit,
+            self.limit,
+            reason,
+        )
+        return self.limit
+
+
+def _get_load_per_core() -> Optional[float]:
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):  # not available on Windows
+        return None
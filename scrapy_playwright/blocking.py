@@ -0,0 +1,73 @@
+"""
+This module includes the built-in policy to block Playwright subrequests.
+Refer to the PLAYWRIGHT_BLOCK_POLICY and PLAYWRIGHT_BLOCK_POLICY_PRESETS
+settings for more information.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Optional, Tuple
+from urllib.parse import urlparse
+
+from playwright.async_api import Request as PlaywrightRequest
+
+
+__all__ = ["BlockPolicy"]
+
+
+@dataclass(frozen=True)
+class BlockPolicy:
+    """Decides which subrequests of a page should be aborted.
+
+    A request is blocked if its resource type is in resource_types, its host
+    (or a parent domain) is in deny_hosts, allow_hosts is not empty and its host
+    is not in it, or its URL matches any of url_patterns. Navigation requests
+    are never blocked.
+    """
+
+    resource_types: FrozenSet[str] = frozenset()
+    deny_hosts: FrozenSet[str] = frozenset()
+    allow_hosts: FrozenSet[str] = frozenset()
+    url_patterns: Tuple[re.Pattern, ...] = field(default_factory=tuple)
+
+    @classmethod
+    def from_dict(cls, options: Optional[dict]) -> Optional["BlockPolicy"]:
+        if not options:
+            return None
+        return cls(
+            resource_types=frozenset(options.get("resource_types") or ()),
+            deny_hosts=frozenset(host.lower() for host in options.get("deny_hosts") or ()),
+            allow_hosts=frozenset(host.lower() for host in options.get("allow_hosts") or ()),
+            url_patterns=tuple(re.compile(pattern) for pattern in options.get("url_patterns") or ()),
+        )
+
+    @classmethod
+    def presets_from_dict(cls, presets: Optional[dict]) -> Dict[str, "BlockPolicy"]:
+        return {
+            name: policy
+            for name, policy in ((name, cls.from_dict(opts)) for name, opts in (presets or {}).items())
+            if policy is not None
+        }
+
+    def block_reason(self, playwright_request: PlaywrightRequest) -> Optional[str]:
+        """Return why the request should be blocked ("resource_type", "host" or
+        "url_pattern"), or None if it should go through."""
+        if playwright_request.is_navigation_request():
+            return None
+        if playwright_request.resource_type in self.resource_types:
+            return "resource_type"
+        if self.deny_hosts or self.allow_hosts:
+            host = (urlparse(playwright_request.url).hostname or "").lower()
+            if self.deny_hosts and _host_matches(host, self.deny_hosts):
+                return "host"
+            if self.allow_hosts and not _host_matches(host, self.allow_hosts):
+                return "host"
+        url = playwright_request.url
+        if any(pattern.search(url) for pattern in self.url_patterns):
+            return "url_pattern"
+        return None
+
+
+def _host_matches(host: str, hosts: FrozenSet[str]) -> bool:
+    """Whether the host, or any of its parent domains, is in the set."""
+    parts = host.split(".")
+    return any(".".join(parts[index:]) in hosts for index in range(len(parts)))
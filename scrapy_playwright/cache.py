@@ -0,0 +1,257 @@
+"""
+This module includes the cache for static subresources of Playwright pages.
+Refer to the PLAYWRIGHT_SUBRESOURCE_CACHE_* settings for more information.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from contextlib import suppress
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+
+__all__ = ["CachedSubresource", "SubresourceCache"]
+
+logger = logging.getLogger("scrapy-playwright")
+
+# headers that don't apply to a body served by route.fulfill
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "set-cookie"}
+
+_MAX_AGE_RE = re.compile(r"(?:^|,)\s*(?:s-maxage|max-age)\s*=\s*(\d+)", re.IGNORECASE)
+
+
+@dataclass
+class CachedSubresource:
+    url: str
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    expires_at: float
+
+    @property
+    def size(self) -> int:
+        return len(self.body)
+
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+
+def freshness_lifetime(headers: Dict[str, str], default_ttl: float = 0) -> float:
+    """Return for how many seconds a response may be reused without revalidation,
+    following its Cache-Control and Expires headers. Responses without either use
+    default_ttl."""
+    cache_control = headers.get("cache-control", "").lower()
+    if "no-store" in cache_control or "no-cache" in cache_control:
+        return 0
+    if match := _MAX_AGE_RE.search(cache_control):
+        return float(match.group(1))
+    if expires := headers.get("expires"):
+        try:
+            expires_at = parsedate_to_datetime(expires).timestamp()
+        except (TypeError, ValueError):
+            return 0  # invalid dates mean "already expired"
+        date_at = time.time()
+        with suppress(TypeError, ValueError):
+            date_at = parsedate_to_datetime(headers["date"]).timestamp()
+        return max(0.0, expires_at - date_at)
+    return default_ttl
+
+
+class SubresourceCache:
+    """Size-bounded LRU cache of subresource responses, kept in memory and
+    optionally on disk. Entries evicted from memory are still served from disk."""
+
+    def __init__(
+        self,
+        memory_limit: int,
+        disk_limit: int = 0,
+        directory: Optional[str] = None,
+        resource_types: Iterable[str] = ("script", "stylesheet", "font", "image"),
+        default_ttl: float = 0,
+    ) -> None:
+        self.memory_limit = memory_limit
+        self.disk_limit = disk_limit
+        self.resource_types = frozenset(resource_types)
+        self.default_ttl = default_ttl
+        self._memory: "OrderedDict[str, CachedSubresource]" = OrderedDict()
+        self._memory_size = 0
+        # key -> body size of the entries on disk, least recently used first
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_size = 0
+        self.directory: Optional[Path] = None
+        if directory and disk_limit > 0:
+            self.directory = Path(directory)
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._load_disk_index()
+
+    def _load_disk_index(self) -> None:
+        paths = sorted(self.directory.glob("*.body"), key=lambda path: path.stat().st_mtime)
+        for path in paths:
+            size = path.stat().st_size
+            self._disk[path.stem] = size
+            self._disk_size += size
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def is_cacheable(self, resource_type: str, method: str, status: int) -> bool:
+        return resource_type in self.resource_types and method == "GET" and status == 200
+
+    def will_store(self, headers: Dict[str, str], size: Optional[int] = None) -> bool:
+        """Return whether put would store a response with these headers, so that
+        its body is only fetched from the browser when it is going to be kept.
+        size defaults to the Content-Length header, when there is one."""
+        if freshness_lifetime(headers, self.default_ttl) <= 0:
+            return False
+        if size is None:
+            try:
+                size = int(headers.get("content-length", ""))
+            except ValueError:
+                return True  # unknown until the body is read
+        return self._fits(size)
+
+    def _fits(self, size: int) -> bool:
+        return size <= self.memory_limit or (
+            self.directory is not None and size <= self.disk_limit
+        )
+
+    def __contains__(self, url: str) -> bool:
+        entry = self._memory.get(url)
+        if entry is not None:
+            return entry.is_fresh()
+        return self._key(url) in self._disk
+
+    async def get(self, url: str) -> Optional[CachedSubresource]:
+        entry = self._memory.get(url)
+        key = self._key(url)
+        if entry is None and key in self._disk:
+            entry = await asyncio.get_event_loop().run_in_executor(None, self._read, url)
+            if entry is not None:
+                self._put_memory(entry)
+            elif key in self._disk:  # the files are gone or unreadable
+                self._disk_size -= self._disk.pop(key)
+        if entry is None:
+            return None
+        if not entry.is_fresh():
+            self._remove(url)
+            return None
+        if url in self._memory:  # entries larger than memory_limit are only on disk
+            self._memory.move_to_end(url)
+        if key in self._disk:
+            self._disk.move_to_end(key)
+        return entry
+
+    async def put(
+        self, url: str, status: int, headers: Dict[str, str], body: bytes
+    ) -> Optional[CachedSubresource]:
+        """Store a response, if its cache headers allow it. Return the stored entry."""
+        lifetime = freshness_lifetime(headers, self.default_ttl)
+        if lifetime <= 0 or not self._fits(len(body)):
+            return None
+        entry = CachedSubresource(
+            url=url,
+            status=status,
+            headers={k: v for k, v in headers.items() if k.lower() not in _DROPPED_HEADERS},
+            body=body,
+            expires_at=time.time() + lifetime,
+        )
+        self._put_memory(entry)
+        if self.directory is not None and entry.size <= self.disk_limit:
+            # only the file I/O runs in the executor, the LRU bookkeeping stays
+            # on the event loop, which is the only thread that touches it
+            loop = asyncio.get_event_loop()
+            if await loop.run_in_executor(None, self._write, entry):
+                evicted_keys = self._put_disk(self._key(entry.url), entry.size)
+                if evicted_keys:
+                    await loop.run_in_executor(None, self._delete_many, evicted_keys)
+        return entry
+
+    def _put_memory(self, entry: CachedSubresource) -> None:
+        old_entry = self._memory.pop(entry.url, None)
+        if old_entry is not None:
+            self._memory_size -= old_entry.size
+        if entry.size > self.memory_limit:
+            return  # it would only evict everything else and then itself
+        self._memory[entry.url] = entry
+        self._memory_size += entry.size
+        while self._memory_size > self.memory_limit and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= evicted.size
+
+    def _put_disk(self, key: str, size: int) -> List[str]:
+        """Record an entry written to disk. Return the keys evicted to make room,
+        whose files are left for the caller to delete."""
+        if key in self._disk:
+            self._disk_size -= self._disk.pop(key)
+        self._disk[key] = size
+        self._disk_size += size
+        evicted_keys = []
+        while self._disk_size > self.disk_limit and self._disk:
+            evicted_key, evicted_size = self._disk.popitem(last=False)
+            self._disk_size -= evicted_size
+            evicted_keys.append(evicted_key)
+        return evicted_keys
+
+    def _remove(self, url: str) -> None:
+        entry = self._memory.pop(url, None)
+        if entry is not None:
+            self._memory_size -= entry.size
+        key = self._key(url)
+        if key in self._disk:
+            self._disk_size -= self._disk.pop(key)
+            self._delete_files(key)
+
+    def _paths(self, key: str):
+        return self.directory / f"{key}.body", self.directory / f"{key}.json"
+
+    def _read(self, url: str) -> Optional[CachedSubresource]:
+        body_path, meta_path = self._paths(self._key(url))
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            return CachedSubresource(
+                url=meta["url"],
+                status=meta["status"],
+                headers=meta["headers"],
+                body=body_path.read_bytes(),
+                expires_at=meta["expires_at"],
+            )
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write(self, entry: CachedSubresource) -> bool:
+        """Write an entry's files. Runs in the executor, so it must not touch the
+        LRU bookkeeping. Return whether the entry was written."""
+        body_path, meta_path = self._paths(self._key(entry.url))
+        meta = {
+            "url": entry.url,
+            "status": entry.status,
+            "headers": entry.headers,
+            "expires_at": entry.expires_at,
+        }
+        # write to temporary files first, since worker processes may share the directory
+        try:
+            for path, data in ((body_path, entry.body), (meta_path, json.dumps(meta).encode())):
+                temp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+                temp_path.write_bytes(data)
+                os.replace(temp_path, path)
+        except OSError as ex:
+            logger.warning("Could not write subresource cache entry for %s: %s", entry.url, ex)
+            return False
+        return True
+
+    def _delete_many(self, keys: List[str]) -> None:
+        for key in keys:
+            self._delete_files(key)
+
+    def _delete_files(self, key: str) -> None:
+        for path in self._paths(key):
+            with suppress(OSError):
+                path.unlink()
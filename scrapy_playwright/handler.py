@@ -1,13 +1,16 @@
+import re
 import sys
 import asyncio
 import logging
-from contextlib import suppress
-from dataclasses import dataclass
+from contextlib import nullcontext, suppress
+from dataclasses import dataclass, field
+from importlib import import_module
 from ipaddress import ip_address
 from time import time
-from typing import Awaitable, Callable, Dict, Optional, Tuple, Type, TypeVar, Union
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Type, TypeVar, Union
 
 from playwright.async_api import (
+    Browser,
     BrowserContext,
     BrowserType,
     Download,
@@ -17,10 +20,12 @@ from playwright.async_api import (
     Request as PlaywrightRequest,
     Response as PlaywrightResponse,
     Route,
+    TimeoutError as PlaywrightTimeoutError,
 )
 from scrapy import Spider, signals
 from scrapy.core.downloader.handlers.http import HTTPDownloadHandler
 from scrapy.crawler import Crawler
+from scrapy.exceptions import IgnoreRequest
 from scrapy.http import Request, Response
 from scrapy.http.headers import Headers
 from scrapy.responsetypes import responsetypes
@@ -28,16 +33,23 @@ from scrapy.settings import Settings
 from scrapy.utils.defer import deferred_from_coro as deferred_from_coro_default
 from scrapy.utils.misc import load_object
 from scrapy.utils.reactor import verify_installed_reactor
-from twisted.internet.defer import Deferred, inlineCallbacks
+from twisted.internet.defer import Deferred, inlineCallbacks, maybeDeferred
 
+from scrapy_playwright.archive import ResponseArchive
+from scrapy_playwright.autotune import PageConcurrencyAutotuner
+from scrapy_playwright.blocking import BlockPolicy
+from scrapy_playwright.cache import SubresourceCache
 from scrapy_playwright.headers import use_scrapy_headers
 from scrapy_playwright.page import PageMethod
+from scrapy_playwright.timing import get_latency_histograms
 from scrapy_playwright._utils import (
     _encode_body,
     _get_header_value,
     _get_page_content,
+    _get_page_extraction,
     _is_safe_close_error,
     _maybe_await,
+    _ResizableSemaphore,
 )
 
 # Supporting for Windows
@@ -87,12 +99,49 @@ DEFAULT_BROWSER_TYPE = "chromium"
 DEFAULT_CONTEXT_NAME = "default"
 PERSISTENT_CONTEXT_PATH_KEY = "user_data_dir"
 
+# Page.goto wait_until values mapped to the load state to wait for after each
+# PageMethod. "commit" has no load state counterpart, the closest is "domcontentloaded".
+_GOTO_WAIT_UNTIL_LOAD_STATE = {
+    "commit": "domcontentloaded",
+    "domcontentloaded": "domcontentloaded",
+    "load": "load",
+    "networkidle": "networkidle",
+}
+
+# Assumed size in bytes of a blocked response of each resource type, used for
+# the estimated_bytes_saved stat until a response of that type has been seen.
+# Overridden per type by PLAYWRIGHT_BLOCKED_SIZE_ESTIMATES.
+_DEFAULT_BLOCKED_SIZE_ESTIMATES = {
+    "image": 30_000,
+    "media": 500_000,
+    "font": 40_000,
+    "stylesheet": 20_000,
+    "script": 50_000,
+}
+
 
 @dataclass
 class BrowserContextWrapper:
     context: BrowserContext
-    semaphore: asyncio.Semaphore
+    semaphore: _ResizableSemaphore
     persistent: bool
+    # index in ScrapyPlaywrightDownloadHandler.browsers, None for persistent contexts
+    browser_index: Optional[int] = None
+    # idle pages waiting to be reused, and the pages currently handed out. Only
+    # pages in use hold the semaphore.
+    page_pool: List[Page] = field(default_factory=list)
+    pages_in_use: set = field(default_factory=set)
+    page_uses: Dict[Page, int] = field(default_factory=dict)
+    # kwargs the context was created with, to create its replacement when retired
+    context_kwargs: Optional[dict] = None
+    # pages handed out by this context so far, including reused ones
+    page_count: int = 0
+    # requests waiting for a page of this context, which must get one even if the
+    # context is retired in the meantime
+    pending_pages: int = 0
+    # retired contexts take no new pages and are closed once their pages are done
+    retiring: bool = False
+    closing: bool = False
 
 
 @dataclass
@@ -105,6 +154,16 @@ class Config:
     max_contexts: Optional[int]
     startup_context_kwargs: dict
     navigation_timeout: Optional[float] = None
+    goto_wait_until: Optional[str] = None
+    route_filter: Union[None, str, List[str]] = None
+    page_pool_size: int = 0
+    page_pool_max_uses: int = 0
+    page_pool_health_check: bool = True
+    browser_pool_size: int = 1
+    browser_pool_strategy: str = "least_loaded"
+    context_max_pages: int = 0
+    context_max_rss: int = 0
+    context_rss_check_interval: float = 30
 
     @classmethod
     def from_settings(cls, settings: Settings) -> "Config":
@@ -116,12 +175,39 @@ class Config:
             max_pages_per_context=settings.getint("PLAYWRIGHT_MAX_PAGES_PER_CONTEXT"),
             max_contexts=settings.getint("PLAYWRIGHT_MAX_CONTEXTS") or None,
             startup_context_kwargs=settings.getdict("PLAYWRIGHT_CONTEXTS"),
+            goto_wait_until=settings.get("PLAYWRIGHT_DEFAULT_GOTO_WAIT_UNTIL") or None,
+            route_filter=settings.get("PLAYWRIGHT_ROUTE_FILTER") or None,
+            page_pool_size=settings.getint("PLAYWRIGHT_PAGE_POOL_SIZE"),
+            page_pool_max_uses=settings.getint("PLAYWRIGHT_PAGE_POOL_MAX_USES"),
+            page_pool_health_check=settings.getbool("PLAYWRIGHT_PAGE_POOL_HEALTH_CHECK", True),
+            browser_pool_size=max(1, settings.getint("PLAYWRIGHT_BROWSER_POOL_SIZE", 1)),
+            browser_pool_strategy=settings.get("PLAYWRIGHT_BROWSER_POOL_STRATEGY")
+            or "least_loaded",
+            context_max_pages=settings.getint("PLAYWRIGHT_CONTEXT_MAX_PAGES"),
+            context_max_rss=settings.getint("PLAYWRIGHT_CONTEXT_MAX_RSS_MB") * 1024**2,
+            context_rss_check_interval=settings.getfloat(
+                "PLAYWRIGHT_CONTEXT_RSS_CHECK_INTERVAL", 30
+            ),
         )
         cfg.cdp_kwargs.pop("endpoint_url", None)
         if not cfg.max_pages_per_context:
             cfg.max_pages_per_context = settings.getint("CONCURRENT_REQUESTS")
         if cfg.cdp_url and cfg.launch_options:
             logger.warning("PLAYWRIGHT_CDP_URL is set, ignoring PLAYWRIGHT_LAUNCH_OPTIONS")
+        if cfg.cdp_url and cfg.browser_pool_size > 1:
+            logger.warning("PLAYWRIGHT_CDP_URL is set, ignoring PLAYWRIGHT_BROWSER_POOL_SIZE")
+            cfg.browser_pool_size = 1
+        if cfg.browser_pool_strategy not in ("least_loaded", "round_robin"):
+            logger.warning(
+                "Unknown PLAYWRIGHT_BROWSER_POOL_STRATEGY %r, using 'least_loaded'",
+                cfg.browser_pool_strategy,
+            )
+            cfg.browser_pool_strategy = "least_loaded"
+        if cfg.goto_wait_until and cfg.goto_wait_until not in _GOTO_WAIT_UNTIL_LOAD_STATE:
+            logger.warning(
+                "Ignoring invalid PLAYWRIGHT_DEFAULT_GOTO_WAIT_UNTIL: %r", cfg.goto_wait_until
+            )
+            cfg.goto_wait_until = None
         if "PLAYWRIGHT_DEFAULT_NAVIGATION_TIMEOUT" in settings:
             with suppress(TypeError, ValueError):
                 cfg.navigation_timeout = float(settings["PLAYWRIGHT_DEFAULT_NAVIGATION_TIMEOUT"])
@@ -134,14 +220,49 @@ class ScrapyPlaywrightDownloadHandler(HTTPDownloadHandler):
         verify_installed_reactor("twisted.internet.asyncioreactor.AsyncioSelectorReactor")
         crawler.signals.connect(self._engine_started, signals.engine_started)
         self.stats = crawler.stats
+        self.latency_histograms = get_latency_histograms(crawler)
 
         self.config = Config.from_settings(crawler.settings)
+        # set in _launch, stays None when replaying from an archive
+        self.playwright_context_manager: Optional[PlaywrightContextManager] = None
 
         self.browser_launch_lock = asyncio.Lock()
+        self.browsers: List[Browser] = []
+        self._browser_round_robin = 0
         self.context_launch_lock = asyncio.Lock()
         self.context_wrappers: Dict[str, BrowserContextWrapper] = {}
+        # retired contexts that are still finishing their in-flight pages
+        self.retiring_context_wrappers: List[BrowserContextWrapper] = []
+        self._last_rss_check = 0.0
+        self._psutil = None
+        if self.config.context_max_rss:
+            try:
+                self._psutil = import_module("psutil")
+            except ImportError:
+                logger.warning(
+                    "PLAYWRIGHT_CONTEXT_MAX_RSS_MB is set but psutil is not available, ignoring it"
+                )
         if self.config.max_contexts:
             self.context_semaphore = asyncio.Semaphore(value=self.config.max_contexts)
+        # lower limits on the pages per context, keyed by what set them (e.g. "memory")
+        self._page_limits: Dict[str, int] = {}
+        self.autotuner: Optional[PageConcurrencyAutotuner] = None
+        if crawler.settings.getbool("PLAYWRIGHT_AUTOTUNE_ENABLED"):
+            self.autotuner = PageConcurrencyAutotuner(
+                initial_limit=crawler.settings.getint("PLAYWRIGHT_AUTOTUNE_INITIAL_PAGES")
+                or self.config.max_pages_per_context,
+                min_limit=crawler.settings.getint("PLAYWRIGHT_AUTOTUNE_MIN_PAGES", 1),
+                max_limit=self.config.max_pages_per_context,
+                window_size=crawler.settings.getint("PLAYWRIGHT_AUTOTUNE_WINDOW", 20),
+                max_error_rate=crawler.settings.getfloat(
+                    "PLAYWRIGHT_AUTOTUNE_MAX_ERROR_RATE", 0.1
+                ),
+                latency_factor=crawler.settings.getfloat(
+                    "PLAYWRIGHT_AUTOTUNE_LATENCY_FACTOR", 2.0
+                ),
+                max_load=crawler.settings.getfloat("PLAYWRIGHT_AUTOTUNE_MAX_LOAD", 1.5),
+            )
+            self._page_limits["autotune"] = self.autotuner.limit
 
         # headers
         if "PLAYWRIGHT_PROCESS_REQUEST_HEADERS" in crawler.settings:
@@ -158,6 +279,61 @@ class ScrapyPlaywrightDownloadHandler(HTTPDownloadHandler):
         if crawler.settings.get("PLAYWRIGHT_ABORT_REQUEST"):
             self.abort_request = load_object(crawler.settings["PLAYWRIGHT_ABORT_REQUEST"])
 
+        # built-in blocking policy, with optional presets selected per request
+        self.block_policy: Optional[BlockPolicy] = BlockPolicy.from_dict(
+            crawler.settings.getdict("PLAYWRIGHT_BLOCK_POLICY")
+        )
+        self.block_policy_presets: Dict[str, BlockPolicy] = BlockPolicy.presets_from_dict(
+            crawler.settings.getdict("PLAYWRIGHT_BLOCK_POLICY_PRESETS")
+        )
+        # URL patterns currently routed on each page, to unroute them on reuse
+        self._page_route_patterns: Dict[Page, list] = {}
+        # PLAYWRIGHT_ROUTE_FILTER conflicts already logged, to log each only once
+        self._route_filter_warnings: set = set()
+        # event handlers attached from the playwright_page_event_handlers meta key,
+        # to detach them before a page goes back to the pool
+        self._page_request_listeners: Dict[Page, list] = {}
+
+        # observed response sizes per resource type, [total bytes, count], used to
+        # estimate the bytes saved by blocked requests
+        self._response_sizes: Dict[str, list] = {}
+        # sizes assumed for resource types that are always blocked, and so never observed
+        self._blocked_size_estimates: Dict[str, int] = {
+            resource_type: int(size)
+            for resource_type, size in {
+                **_DEFAULT_BLOCKED_SIZE_ESTIMATES,
+                **crawler.settings.getdict("PLAYWRIGHT_BLOCKED_SIZE_ESTIMATES"),
+            }.items()
+        }
+
+        # static subresources served from a local cache with route.fulfill
+        self.subresource_cache: Optional[SubresourceCache] = None
+        if crawler.settings.getbool("PLAYWRIGHT_SUBRESOURCE_CACHE_ENABLED"):
+            self.subresource_cache = SubresourceCache(
+                memory_limit=crawler.settings.getint("PLAYWRIGHT_SUBRESOURCE_CACHE_MEMORY_MB", 64)
+                * 1024**2,
+                disk_limit=crawler.settings.getint("PLAYWRIGHT_SUBRESOURCE_CACHE_DISK_MB")
+                * 1024**2,
+                directory=crawler.settings.get("PLAYWRIGHT_SUBRESOURCE_CACHE_DIR"),
+                resource_types=crawler.settings.getlist(
+                    "PLAYWRIGHT_SUBRESOURCE_CACHE_RESOURCE_TYPES",
+                    ["script", "stylesheet", "font", "image"],
+                ),
+                default_ttl=crawler.settings.getfloat("PLAYWRIGHT_SUBRESOURCE_CACHE_DEFAULT_TTL"),
+            )
+
+        # record rendered responses to an archive, or replay them without a browser
+        self.archive_mode: Optional[str] = crawler.settings.get("PLAYWRIGHT_ARCHIVE_MODE") or None
+        self.response_archive: Optional[ResponseArchive] = None
+        if self.archive_mode not in (None, "record", "replay"):
+            logger.warning("Ignoring invalid PLAYWRIGHT_ARCHIVE_MODE: %r", self.archive_mode)
+            self.archive_mode = None
+        if self.archive_mode is not None:
+            self.response_archive = ResponseArchive(
+                path=crawler.settings.get("PLAYWRIGHT_ARCHIVE_PATH"),
+                key_meta_keys=crawler.settings.getlist("PLAYWRIGHT_ARCHIVE_KEY_META_KEYS"),
+            )
+
     @classmethod
     def from_crawler(cls: Type[PlaywrightHandler], crawler: Crawler) -> PlaywrightHandler:
         return cls(crawler)
@@ -169,6 +345,18 @@ class ScrapyPlaywrightDownloadHandler(HTTPDownloadHandler):
     async def _launch(self) -> None:
         """Launch Playwright manager and configured startup context(s)."""
         logger.info("Starting download handler")
+        if self.archive_mode == "replay":
+            count = self.response_archive.load()
+            logger.info(
+                "Replaying %i response(s) from %s, not launching Playwright",
+                count,
+                self.response_archive.path,
+            )
+            self.stats.set_value("playwright/archive/loaded", count)
+            return
+        if self.archive_mode == "record":
+            self.response_archive.open_for_recording()
+            logger.info("Recording rendered responses to %s", self.response_archive.path)
         self.playwright_context_manager = PlaywrightContextManager()
         self.playwright = await self.playwright_context_manager.start()
         self.browser_type: BrowserType = getattr(self.playwright, self.config.browser_type_name)
@@ -184,19 +372,56 @@ class ScrapyPlaywrightDownloadHandler(HTTPDownloadHandler):
             logger.info("Startup context(s) launched")
             self.stats.set_value("playwright/page_count", self._get_total_page_count())
 
-    async def _maybe_launch_browser(self) -> None:
+    @property
+    def browser(self) -> Browser:
+        """The first browser of the pool."""
+        if not self.browsers:
+            raise AttributeError("browser")
+        return self.browsers[0]
+
+    async def _maybe_launch_browser(self, browser_index: Optional[int] = None) -> int:
+        """Return the index of the browser a new context should be placed on,
+        launching browsers lazily up to PLAYWRIGHT_BROWSER_POOL_SIZE."""
         async with self.browser_launch_lock:
-            if not hasattr(self, "browser"):
-                logger.info("Launching browser %s", self.browser_type.name)
-                self.browser = await self.browser_type.launch(**self.config.launch_options)
+            if browser_index is None:
+                browser_index = self._pick_browser_index()
+            while len(self.browsers) <= browser_index:
+                logger.info(
+                    "Launching browser %s (%i/%i)",
+                    self.browser_type.name,
+                    len(self.browsers) + 1,
+                    self.config.browser_pool_size,
+                )
+                self.browsers.append(await self.browser_type.launch(**self.config.launch_options))
                 logger.info("Browser %s launched", self.browser_type.name)
+            return browser_index
+
+    def _pick_browser_index(self) -> int:
+        # launch a new browser while the pool is not full, then spread the contexts
+        if len(self.browsers) < self.config.browser_pool_size:
+            return len(self.browsers)
+        if self.config.browser_pool_strategy == "round_robin":
+            self._browser_round_robin = (self._browser_round_robin + 1) % len(self.browsers)
+            return self._browser_round_robin
+        loads = self._get_browser_loads()
+        return min(range(len(self.browsers)), key=lambda index: loads[index])
+
+    def _get_browser_loads(self) -> List[int]:
+        """Number of pages in use on each browser of the pool."""
+        loads = [0] * len(self.browsers)
+        for ctx_wrapper in [*self.context_wrappers.values(), *self.retiring_context_wrappers]:
+            if ctx_wrapper.browser_index is not None and ctx_wrapper.browser_index < len(loads):
+                loads[ctx_wrapper.browser_index] += len(ctx_wrapper.pages_in_use)
+        return loads
 
     async def _maybe_connect_devtools(self) -> None:
         async with self.browser_launch_lock:
-            if not hasattr(self, "browser"):
+            if not self.browsers:
                 logger.info("Connecting using CDP: %s", self.config.cdp_url)
-                self.browser = await self.browser_type.connect_over_cdp(
-                    self.config.cdp_url, **self.config.cdp_kwargs
+                self.browsers.append(
+                    await self.browser_type.connect_over_cdp(
+                        self.config.cdp_url, **self.config.cdp_kwargs
+                    )
                 )
                 logger.info("Connected using CDP: %s", self.config.cdp_url)
 
@@ -205,30 +430,37 @@ class ScrapyPlaywrightDownloadHandler(HTTPDownloadHandler):
         name: str,
         context_kwargs: Optional[dict],
         spider: Optional[Spider] = None,
+        browser_index: Optional[int] = None,
+        context_slot_acquired: bool = False,
     ) -> BrowserContextWrapper:
         """Create a new context, also launching a local browser or connecting
-        to a remote one if necessary.
+        to a remote one if necessary. Pass context_slot_acquired if the caller
+        already holds a slot of PLAYWRIGHT_MAX_CONTEXTS for it.
         """
-        if hasattr(self, "context_semaphore"):
+        if hasattr(self, "context_semaphore") and not context_slot_acquired:
             await self.context_semaphore.acquire()
         context_kwargs = context_kwargs or {}
         if context_kwargs.get(PERSISTENT_CONTEXT_PATH_KEY):
             context = await self.browser_type.launch_persistent_context(**context_kwargs)
             persistent = True
             remote = False
+            browser_index = None
         elif self.config.cdp_url:
             await self._maybe_connect_devtools()
-            context = await self.browser.new_context(**context_kwargs)
+            browser_index = 0
+            context = await self.browsers[browser_index].new_context(**context_kwargs)
             persistent = False
             remote = True
         else:
-            await self._maybe_launch_browser()
-            context = await self.browser.new_context(**context_kwargs)
+            browser_index = await self._maybe_launch_browser(browser_index)
+            context = await self.browsers[browser_index].new_context(**context_kwargs)
             persistent = False
             remote = False
+            self.stats.inc_value(f"playwright/browser/{browser_index}/context_count")
 
         context.on(
-            "close", self._make_close_browser_context_callback(name, persistent, remote, spider)
+            "close",
+            self._make_close_browser_context_callback(name, context, persistent, remote, spider),
         )
         self.stats.inc_value("playwright/context_count")
         self.stats.inc_value(f"playwright/context_count/persistent/{persistent}")
@@ -249,29 +481,102 @@ class ScrapyPlaywrightDownloadHandler(HTTPDownloadHandler):
             context.set_default_navigation_timeout(self.config.navigation_timeout)
         self.context_wrappers[name] = BrowserContextWrapper(
             context=context,
-            semaphore=asyncio.Semaphore(value=self.config.max_pages_per_context),
+            semaphore=_ResizableSemaphore(value=self._get_page_limit()),
             persistent=persistent,
+            browser_index=browser_index,
+            context_kwargs=context_kwargs,
         )
         self._set_max_concurrent_context_count()
         return self.context_wrappers[name]
 
+    def _get_context_name(self, request: Request) -> str:
+        """Return the context of a request. With a browser pool, requests that don't
+        name a context are spread over one default context per browser, picking
+        the one with the fewest pages in use."""
+        if "playwright_context" not in request.meta and self.config.browser_pool_size > 1:
+            names = [
+                f"{DEFAULT_CONTEXT_NAME}-{index}" for index in range(self.config.browser_pool_size)
+            ]
+            request.meta["playwright_context"] = min(
+                names,
+                key=lambda name: len(self.context_wrappers[name].pages_in_use)
+                if name in self.context_wrappers
+                else -1,
+            )
+        return request.meta.setdefault("playwright_context", DEFAULT_CONTEXT_NAME)
+
+    def _get_default_context_browser_index(self, context_name: str) -> Optional[int]:
+        """The sharded default contexts are pinned to the browser with the same index."""
+        prefix = f"{DEFAULT_CONTEXT_NAME}-"
+        if self.config.browser_pool_size > 1 and context_name.startswith(prefix):
+            with suppress(ValueError):
+                index = int(context_name[len(prefix) :])
+                if index < self.config.browser_pool_size:
+                    return index
+        return None
+
     async def _create_page(self, request: Request, spider: Spider) -> Page:
         """Create a new page in a context, also creating a new context if necessary."""
-        context_name = request.meta.setdefault("playwright_context", DEFAULT_CONTEXT_NAME)
-        # this block needs to be locked because several attempts to launch a context
-        # with the same name could happen at the same time from different requests
-        async with self.context_launch_lock:
-            ctx_wrapper = self.context_wrappers.get(context_name)
-            if ctx_wrapper is None:
-                ctx_wrapper = await self._create_browser_context(
-                    name=context_name,
-                    context_kwargs=request.meta.get("playwright_context_kwargs"),
-                    spider=spider,
-                )
+        context_name = self._get_context_name(request)
+        context_kwargs = request.meta.get("playwright_context_kwargs")
+        # a PLAYWRIGHT_MAX_CONTEXTS slot waited for outside of the lock
+        context_slot_acquired = False
+        try:
+            while True:
+                # this block needs to be locked because several attempts to launch a
+                # context with the same name could happen at the same time from
+                # different requests
+                async with self.context_launch_lock:
+                    self._maybe_retire_context_by_rss(spider)
+                    ctx_wrapper = self.context_wrappers.get(context_name)
+                    if (
+                        ctx_wrapper is not None
+                        and not ctx_wrapper.persistent
+                        and self.config.context_max_pages > 0
+                        and ctx_wrapper.page_count >= self.config.context_max_pages
+                    ):
+                        self._retire_context(context_name, ctx_wrapper, "max_pages", spider)
+                        context_kwargs = ctx_wrapper.context_kwargs
+                        ctx_wrapper = None
+                    if ctx_wrapper is None and (
+                        context_slot_acquired
+                        or not hasattr(self, "context_semaphore")
+                        or not self.context_semaphore.locked()
+                    ):
+                        ctx_wrapper = await self._create_browser_context(
+                            name=context_name,
+                            context_kwargs=context_kwargs,
+                            spider=spider,
+                            browser_index=self._get_default_context_browser_index(context_name),
+                            context_slot_acquired=context_slot_acquired,
+                        )
+                        context_slot_acquired = False
+                    if ctx_wrapper is not None:
+                        ctx_wrapper.page_count += 1
+                        ctx_wrapper.pending_pages += 1
+                        break
+                # Every context slot is taken, e.g. by a retired context that is
+                # still finishing its pages. Wait for one without holding the lock,
+                # so requests for contexts that are already open are not held up,
+                # then check again in case another request created the context.
+                await self.context_semaphore.acquire()
+                context_slot_acquired = True
+        finally:
+            if context_slot_acquired:
+                self.context_semaphore.release()
+
+        try:
+            page, pooled = await self._acquire_page(ctx_wrapper, context_name)
+        finally:
+            ctx_wrapper.pending_pages -= 1
+            # in case the context was retired while waiting and the wait failed
+            self._maybe_close_retired_context(ctx_wrapper)
+        if pooled:
+            return page
 
-        await ctx_wrapper.semaphore.acquire()
-        page = await ctx_wrapper.context.new_page()
         self.stats.inc_value("playwright/page_count")
+        if ctx_wrapper.browser_index is not None:
+            self.stats.inc_value(f"playwright/browser/{ctx_wrapper.browser_index}/page_count")
         total_page_count = self._get_total_page_count()
         logger.debug(
             "[Context=%s] New page created, page count is %i (%i for all contexts)",
@@ -291,23 +596,246 @@ class ScrapyPlaywrightDownloadHandler(HTTPDownloadHandler):
         if self.config.navigation_timeout is not None:
             page.set_default_navigation_timeout(self.config.navigation_timeout)
 
-        page.on("close", self._make_close_page_callback(context_name))
-        page.on("crash", self._make_close_page_callback(context_name))
+        page.on("close", self._make_close_page_callback(ctx_wrapper, page))
+        page.on("crash", self._make_close_page_callback(ctx_wrapper, page))
         page.on("request", _make_request_logger(context_name, spider))
         page.on("response", _make_response_logger(context_name, spider))
         page.on("request", self._increment_request_stats)
         page.on("response", self._increment_response_stats)
+        if self.subresource_cache is not None:
+            page.on("response", self._maybe_cache_subresource)
 
         return page
 
+    async def _acquire_page(
+        self, ctx_wrapper: BrowserContextWrapper, context_name: str
+    ) -> Tuple[Page, bool]:
+        """Wait for a free page slot in a context and fill it with a pooled page or a
+        new one. Returns the page and whether it came from the pool."""
+        await ctx_wrapper.semaphore.acquire()
+        try:
+            page = await self._get_pooled_page(ctx_wrapper, context_name)
+            pooled = page is not None
+            if page is None:
+                page = await ctx_wrapper.context.new_page()
+        except BaseException:
+            ctx_wrapper.semaphore.release()
+            raise
+        ctx_wrapper.pages_in_use.add(page)
+        ctx_wrapper.page_uses[page] = ctx_wrapper.page_uses.get(page, 0) + 1
+        return page, pooled
+
+    async def _get_pooled_page(
+        self, ctx_wrapper: BrowserContextWrapper, context_name: str
+    ) -> Optional[Page]:
+        """Return a healthy idle page from the context's pool, if there is one."""
+        if self.config.page_pool_size <= 0:
+            return None
+        while ctx_wrapper.page_pool:
+            page = ctx_wrapper.page_pool.pop()
+            if await self._is_page_healthy(page):
+                self.stats.inc_value("playwright/page_pool/hit")
+                logger.debug("[Context=%s] Reusing pooled page", context_name)
+                return page
+            self.stats.inc_value("playwright/page_pool/retired/unhealthy")
+            with suppress(PlaywrightError):
+                await page.close()
+        self.stats.inc_value("playwright/page_pool/miss")
+        return None
+
+    async def _is_page_healthy(self, page: Page) -> bool:
+        if page.is_closed():
+            return False
+        if not self.config.page_pool_health_check:
+            return True
+        try:
+            return await asyncio.wait_for(page.evaluate("1"), timeout=5) == 1
+        except Exception:
+            return False
+
+    def _retire_context(
+        self, name: str, ctx_wrapper: BrowserContextWrapper, reason: str, spider: Spider
+    ) -> None:
+        """Stop handing out pages from a context. New requests for the same name get
+        a fresh context, and the old one is closed once its in-flight pages are done."""
+        logger.info(
+            "[Context=%s] Retiring browser context (reason: %s, pages: %i)",
+            name,
+            reason,
+            ctx_wrapper.page_count,
+            extra={"spider": spider, "context_name": name, "reason": reason},
+        )
+        self.stats.inc_value(f"playwright/context_count/retired/{reason}")
+        if self.context_wrappers.get(name) is ctx_wrapper:
+            del self.context_wrappers[name]
+        ctx_wrapper.retiring = True
+        self.retiring_context_wrappers.append(ctx_wrapper)
+        for page in ctx_wrapper.page_pool.copy():
+            asyncio.ensure_future(page.close())
+        ctx_wrapper.page_pool.clear()
+        self._maybe_close_retired_context(ctx_wrapper)
+
+    def _maybe_close_retired_context(self, ctx_wrapper: BrowserContextWrapper) -> None:
+        if (
+            ctx_wrapper.retiring
+            and not ctx_wrapper.closing
+            and not ctx_wrapper.pages_in_use
+            and not ctx_wrapper.pending_pages
+        ):
+            ctx_wrapper.closing = True
+            asyncio.ensure_future(ctx_wrapper.context.close())
+
+    def _maybe_retire_context_by_rss(self, spider: Spider) -> None:
+        """If the Playwright processes use more than PLAYWRIGHT_CONTEXT_MAX_RSS_MB,
+        retire the context that has handed out the most pages. The memory of a single
+        context can't be told apart from its browser's, so the total is used."""
+        if self._psutil is None or not self.config.context_max_rss:
+            return
+        now = time()
+        if now - self._last_rss_check < self.config.context_rss_check_interval:
+            return
+        self._last_rss_check = now
+        rss = self._get_playwright_rss()
+        if rss is None or rss < self.config.context_max_rss:
+            return
+        candidates = [
+            (name, ctx_wrapper)
+            for name, ctx_wrapper in self.context_wrappers.items()
+            if not ctx_wrapper.persistent and ctx_wrapper.page_count > 0
+        ]
+        if candidates:
+            name, ctx_wrapper = max(candidates, key=lambda item: item[1].page_count)
+            self._retire_context(name, ctx_wrapper, "max_rss", spider)
+
+    def _get_playwright_rss(self) -> Optional[int]:
+        """Total RSS of the Playwright driver and all its descendant processes."""
+        try:
+            pid = self.playwright_context_manager._connection._transport._proc.pid
+            process = self._psutil.Process(pid)
+            processes = [process, *process.children(recursive=True)]
+        except Exception:
+            return None
+        total = 0
+        for process in processes:
+            with suppress(Exception):  # might fail if the process exited in the meantime
+                total += process.memory_info().rss
+        return total
+
+    def _find_context_wrapper(
+        self, page: Page, context_name: str
+    ) -> Optional[BrowserContextWrapper]:
+        ctx_wrapper = self.context_wrappers.get(context_name)
+        if ctx_wrapper is not None and page in ctx_wrapper.pages_in_use:
+            return ctx_wrapper
+        for retiring_wrapper in self.retiring_context_wrappers:
+            if page in retiring_wrapper.pages_in_use:
+                return retiring_wrapper
+        return ctx_wrapper
+
+    async def _release_page(self, page: Page, context_name: str) -> None:
+        """Return a page to its context's pool, or close it if it can't be reused."""
+        ctx_wrapper = self._find_context_wrapper(page, context_name)
+        if (
+            ctx_wrapper is None
+            or ctx_wrapper.retiring
+            or page not in ctx_wrapper.pages_in_use
+            or page.is_closed()
+            or len(ctx_wrapper.page_pool) >= self.config.page_pool_size
+        ):
+            await page.close()
+            self.stats.inc_value("playwright/page_count/closed")
+            return
+        if (
+            self.config.page_pool_max_uses > 0
+            and ctx_wrapper.page_uses.get(page, 0) >= self.config.page_pool_max_uses
+        ):
+            self.stats.inc_value("playwright/page_pool/retired/max_uses")
+            await page.close()
+            self.stats.inc_value("playwright/page_count/closed")
+            return
+
+        # reset the page: detach per-request handlers and routes, and leave the
+        # current document so that its scripts and memory are released
+        try:
+            for event, handler in self._page_request_listeners.pop(page, []):
+                page.remove_listener(event, handler)
+            for pattern in self._page_route_patterns.get(page, []):
+                await page.unroute(pattern)
+            self._page_route_patterns[page] = []
+            await page.goto("about:blank")
+        except Exception:
+            self.stats.inc_value("playwright/page_pool/retired/unhealthy")
+            await page.close()
+            self.stats.inc_value("playwright/page_count/closed")
+            return
+
+        ctx_wrapper.pages_in_use.discard(page)
+        ctx_wrapper.page_pool.append(page)
+        ctx_wrapper.semaphore.release()
+        self.stats.inc_value("playwright/page_pool/returned")
+
     def _get_total_page_count(self):
-        return sum(len(ctx.context.pages) for ctx in self.context_wrappers.values())
+        return sum(
+            len(ctx.context.pages)
+            for ctx in [*self.context_wrappers.values(), *self.retiring_context_wrappers]
+        )
 
     def _set_max_concurrent_page_count(self):
         count = self._get_total_page_count()
         current_max_count = self.stats.get_value("playwright/page_count/max_concurrent")
         if current_max_count is None or count > current_max_count:
             self.stats.set_value("playwright/page_count/max_concurrent", count)
+        for index, load in enumerate(self._get_browser_loads()):
+            self.stats.max_value(f"playwright/browser/{index}/page_count/max_concurrent", load)
+
+    def _get_page_limit(self) -> int:
+        """Current limit of pages in use per context."""
+        return min(self.config.max_pages_per_context, *self._page_limits.values())
+
+    def set_page_limit(self, reason: str, limit: Optional[int]) -> None:
+        """Lower the pages in use per context below PLAYWRIGHT_MAX_PAGES_PER_CONTEXT,
+        or lift the limit set for the same reason if limit is None. Pages already in
+        use are not closed, new pages wait until the context is below the limit."""
+        if limit is None:
+            self._page_limits.pop(reason, None)
+        else:
+            self._page_limits[reason] = max(1, limit)
+        page_limit = self._get_page_limit()
+        for ctx_wrapper in [*self.context_wrappers.values(), *self.retiring_context_wrappers]:
+            ctx_wrapper.semaphore.set_limit(page_limit)
+        self.stats.set_value("playwright/page_limit", page_limit)
+
+    def _time_stage(self, request: Request, stage: str):
+        """Time a stage of a download into the latency histogram of its request kind."""
+        if self.latency_histograms is None:
+            return nullcontext()
+        return self.latency_histograms.time(request.meta.get("request_kind"), stage)
+
+    def _is_context_saturated(self, context_name: str) -> bool:
+        ctx_wrapper = self.context_wrappers.get(context_name)
+        return ctx_wrapper is not None and ctx_wrapper.semaphore.locked()
+
+    def _autotune(
+        self,
+        saturated: bool,
+        latency: Optional[float] = None,
+        error: bool = False,
+        timeout: bool = False,
+        kind: Optional[str] = None,
+    ) -> None:
+        if self.autotuner is None:
+            return
+        if timeout:
+            self.stats.inc_value("playwright/autotune/timeouts")
+        new_limit = self.autotuner.observe(
+            latency=latency, error=error, timeout=timeout, saturated=saturated, kind=kind
+        )
+        if new_limit is None:
+            return
+        self.stats.inc_value("playwright/autotune/adjustments")
+        self.stats.max_value("playwright/autotune/max_limit", new_limit)
+        self.stats.min_value("playwright/autotune/min_limit", new_limit)
+        self.set_page_limit("autotune", new_limit)
 
     def _set_max_concurrent_context_count(self):
         current_max_count = self.stats.get_value("playwright/context_count/max_concurrent")
@@ -323,50 +851,96 @@ class ScrapyPlaywrightDownloadHandler(HTTPDownloadHandler):
         yield deferred_from_coro(self._close())
 
     async def _close(self) -> None:
-        await asyncio.gather(*[ctx.context.close() for ctx in self.context_wrappers.values()])
+        if self.response_archive is not None:
+            self.response_archive.close()
+        if self.archive_mode == "replay":
+            return
+        if self.subresource_cache is not None:
+            hits = self.stats.get_value("playwright/subresource_cache/hit", 0)
+            misses = self.stats.get_value("playwright/subresource_cache/miss", 0)
+            if hits + misses:
+                self.stats.set_value(
+                    "playwright/subresource_cache/hit_rate", round(hits / (hits + misses), 4)
+                )
+        await asyncio.gather(
+            *[
+                ctx.context.close()
+                for ctx in [*self.context_wrappers.values(), *self.retiring_context_wrappers]
+            ]
+        )
         self.context_wrappers.clear()
-        if hasattr(self, "browser"):
-            logger.info("Closing browser")
-            await self.browser.close()
+        self.retiring_context_wrappers.clear()
+        if self.browsers:
+            logger.info("Closing %i browser(s)", len(self.browsers))
+            await asyncio.gather(*[browser.close() for browser in self.browsers])
+            self.browsers.clear()
         await self.playwright_context_manager.__aexit__()
         await self.playwright.stop()
 
     def download_request(self, request: Request, spider: Spider) -> Deferred:
         if request.meta.get("playwright"):
+            if self.archive_mode == "replay":
+                return maybeDeferred(self._replay_request, request, spider)
             return deferred_from_coro(self._download_request(request, spider))
         return super().download_request(request, spider)
 
+    def _replay_request(self, request: Request, spider: Spider) -> Response:
+        response = self.response_archive.replay(request)
+        if response is None:
+            self.stats.inc_value("playwright/archive/replay_miss")
+            logger.warning(
+                "No recorded response for %s",
+                request,
+                extra={
+                    "spider": spider,
+                    "scrapy_request_url": request.url,
+                    "scrapy_request_method": request.method,
+                },
+            )
+            raise IgnoreRequest(f"No recorded response for {request}")
+        self.stats.inc_value("playwright/archive/replayed")
+        return response
+
     async def _download_request(self, request: Request, spider: Spider) -> Response:
         page = request.meta.get("playwright_page")
         if not isinstance(page, Page):
-            page = await self._create_page(request=request, spider=spider)
-        context_name = request.meta.setdefault("playwright_context", DEFAULT_CONTEXT_NAME)
+            with self._time_stage(request, "page_creation"):
+                page = await self._create_page(request=request, spider=spider)
+        context_name = self._get_context_name(request)
 
-        _attach_page_event_handlers(
+        self._page_request_listeners[page] = _attach_page_event_handlers(
             page=page, request=request, spider=spider, context_name=context_name
         )
 
-        await page.unroute("**")
-        await page.route(
-            "**",
-            self._make_request_handler(
-                context_name=context_name,
-                method=request.method,
-                url=request.url,
-                headers=request.headers,
-                body=request.body,
-                encoding=request.encoding,
-                spider=spider,
-            ),
+        block_policy = self._get_block_policy(request, spider)
+        request_handler = self._make_request_handler(
+            context_name=context_name,
+            method=request.method,
+            url=request.url,
+            headers=request.headers,
+            body=request.body,
+            encoding=request.encoding,
+            spider=spider,
+            block_policy=block_policy,
         )
+        if page not in self._page_route_patterns:
+            page.on("close", lambda: self._forget_page(page))
+        for pattern in self._page_route_patterns.get(page, ["**"]):
+            await page.unroute(pattern)
+        route_patterns = self._get_route_patterns(request, block_policy)
+        self._page_route_patterns[page] = route_patterns
+        for pattern in route_patterns:
+            await page.route(pattern, request_handler)
 
         await _maybe_execute_page_init_callback(
             page=page, request=request, context_name=context_name, spider=spider
         )
 
+        saturated = self._is_context_saturated(context_name)
         try:
-            return await self._download_request_with_page(request, page, spider)
+            response = await self._download_request_with_page(request, page, spider)
         except Exception as ex:
+            self._autotune(saturated, error=True, timeout=isinstance(ex, PlaywrightTimeoutError))
             if not request.meta.get("playwright_include_page") and not page.is_closed():
                 logger.warning(
                     "Closing page due to failed request: %s exc_type=%s exc_msg=%s",
@@ -383,6 +957,97 @@ class ScrapyPlaywrightDownloadHandler(HTTPDownloadHandler):
                 await page.close()
                 self.stats.inc_value("playwright/page_count/closed")
             raise
+        self._autotune(
+            saturated,
+            latency=request.meta.get("download_latency"),
+            error=response.status == 429 or response.status >= 500,
+            kind=request.meta.get("request_kind"),
+        )
+
+        if self.archive_mode == "record":
+            await asyncio.get_event_loop().run_in_executor(
+                None, self.response_archive.record, request, response
+            )
+            self.stats.inc_value("playwright/archive/recorded")
+        return response
+
+    def _get_route_patterns(
+        self, request: Request, block_policy: Optional[BlockPolicy]
+    ) -> List[Union[str, re.Pattern]]:
+        """URL patterns to intercept for a request, see PLAYWRIGHT_ROUTE_FILTER.
+
+        Intercepting "**" sends every subrequest of the page through _request_handler.
+        Glob and regex patterns are matched by the browser instead, so subrequests that
+        don't match never make the round trip to Python. The navigation request is
+        always intercepted, to apply the Scrapy method, body and headers to it.
+        """
+        route_filter = request.meta.get("playwright_route_filter", self.config.route_filter)
+        if not route_filter:
+            return ["**"]
+        navigation_pattern = re.compile("^" + re.escape(request.url.rstrip("/")) + "/?$")
+        if route_filter == "navigation":
+            # other subrequests still need to go through the handler to be blocked,
+            # served from the subresource cache or given the processed headers
+            conflicts = self._get_route_filter_conflicts(block_policy, headers=True)
+            if conflicts:
+                self._warn_route_filter(
+                    "PLAYWRIGHT_ROUTE_FILTER='navigation' has no effect while %s is set,"
+                    " every subrequest is still intercepted",
+                    conflicts,
+                )
+                return ["**"]
+            return [navigation_pattern]
+        if isinstance(route_filter, str):
+            route_filter = [route_filter]
+        conflicts = self._get_route_filter_conflicts(block_policy, headers=False)
+        if conflicts:
+            self._warn_route_filter(
+                "PLAYWRIGHT_ROUTE_FILTER patterns are set, so %s only applies to the"
+                " subrequests that match them",
+                conflicts,
+            )
+        return [navigation_pattern, *route_filter]
+
+    def _get_route_filter_conflicts(
+        self, block_policy: Optional[BlockPolicy], headers: bool
+    ) -> List[str]:
+        """Settings that need to see the subrequests a route filter would skip."""
+        conflicts = []
+        if block_policy is not None:
+            conflicts.append("PLAYWRIGHT_BLOCK_POLICY")
+        if self.abort_request is not None:
+            conflicts.append("PLAYWRIGHT_ABORT_REQUEST")
+        if self.subresource_cache is not None:
+            conflicts.append("PLAYWRIGHT_SUBRESOURCE_CACHE_ENABLED")
+        if headers and self.process_request_headers is not None:
+            conflicts.append("PLAYWRIGHT_PROCESS_REQUEST_HEADERS")
+        return conflicts
+
+    def _warn_route_filter(self, message: str, conflicts: List[str]) -> None:
+        """Log a PLAYWRIGHT_ROUTE_FILTER conflict the first time it is seen."""
+        key = (message, tuple(conflicts))
+        if key not in self._route_filter_warnings:
+            self._route_filter_warnings.add(key)
+            logger.warning(message, ", ".join(conflicts))
+
+    def _get_block_policy(self, request: Request, spider: Spider) -> Optional[BlockPolicy]:
+        """Return the preset named in the playwright_block_preset meta key,
+        or the default policy."""
+        preset = request.meta.get("playwright_block_preset")
+        if preset is None:
+            return self.block_policy
+        if preset not in self.block_policy_presets:
+            logger.warning(
+                "Unknown block policy preset %r, using the default policy",
+                preset,
+                extra={
+                    "spider": spider,
+                    "scrapy_request_url": request.url,
+                    "scrapy_request_method": request.method,
+                },
+            )
+            return self.block_policy
+        return self.block_policy_presets[preset]
 
     async def _download_request_with_page(
         self, request: Request, page: Page, spider: Spider
@@ -392,7 +1057,8 @@ class ScrapyPlaywrightDownloadHandler(HTTPDownloadHandler):
             request.meta["playwright_page"] = page
 
         start_time = time()
-        response, download = await self._get_response_and_download(request=request, page=page)
+        with self._time_stage(request, "goto"):
+            response, download = await self._get_response_and_download(request=request, page=page)
         if isinstance(response, PlaywrightResponse):
             await _set_redirect_meta(request=request, response=response)
             headers = Headers(await response.all_headers())
@@ -411,15 +1077,31 @@ class ScrapyPlaywrightDownloadHandler(HTTPDownloadHandler):
             )
             headers = Headers()
 
-        await self._apply_page_methods(page, request, spider)
-        body_str = await _get_page_content(
-            page=page,
-            spider=spider,
-            context_name=request.meta.get("playwright_context"),
-            scrapy_request_url=request.url,
-            scrapy_request_method=request.method,
-        )
+        with self._time_stage(request, "wait_for_selectors"):
+            await self._wait_for_selectors(page, request)
+        with self._time_stage(request, "page_methods"):
+            await self._apply_page_methods(page, request, spider)
+        extract_spec = request.meta.get("playwright_extract")
+        if extract_spec:
+            # only the extracted fields cross the Playwright pipe, not the whole DOM
+            with self._time_stage(request, "extract"):
+                body_str = await _get_page_extraction(page, extract_spec)
+            headers["Content-Type"] = "application/json; charset=utf-8"
+            self.stats.inc_value("playwright/extract_count")
+        else:
+            with self._time_stage(request, "content"):
+                body_str = await _get_page_content(
+                    page=page,
+                    spider=spider,
+                    context_name=request.meta.get("playwright_context"),
+                    scrapy_request_url=request.url,
+                    scrapy_request_method=request.method,
+                )
         request.meta["download_latency"] = time() - start_time
+        if self.latency_histograms is not None:
+            self.latency_histograms.observe(
+                request.meta.get("request_kind"), "download", request.meta["download_latency"]
+            )
 
         server_ip_address = None
         if response is not None:
@@ -431,9 +1113,11 @@ class ScrapyPlaywrightDownloadHandler(HTTPDownloadHandler):
         if download.get("exception"):
             raise download["exception"]
 
+        # read before the page is released, since a pooled page is reset to
+        # about:blank and may be handed to another request right away
+        final_url = page.url
         if not request.meta.get("playwright_include_page"):
-            await page.close()
-            self.stats.inc_value("playwright/page_count/closed")
+            await self._release_page(page, request.meta["playwright_context"])
 
         if download:
             request.meta["playwright_suggested_filename"] = download.get("suggested_filename")
@@ -446,10 +1130,11 @@ class ScrapyPlaywrightDownloadHandler(HTTPDownloadHandler):
                 flags=["playwright"],
             )
 
-        body, encoding = _encode_body(headers=headers, text=body_str)
-        respcls = responsetypes.from_args(headers=headers, url=page.url, body=body)
+        with self._time_stage(request, "encode_body"):
+            body, encoding = _encode_body(headers=headers, text=body_str)
+        respcls = responsetypes.from_args(headers=headers, url=final_url, body=body)
         return respcls(
-            url=page.url,
+            url=final_url,
             status=response.status if response is not None else 200,
             headers=headers,
             body=body,
@@ -480,8 +1165,10 @@ class ScrapyPlaywrightDownloadHandler(HTTPDownloadHandler):
             finally:
                 download_ready.set()
 
-        page_goto_kwargs = request.meta.get("playwright_page_goto_kwargs") or {}
+        page_goto_kwargs = dict(request.meta.get("playwright_page_goto_kwargs") or {})
         page_goto_kwargs.pop("url", None)
+        if self.config.goto_wait_until:
+            page_goto_kwargs.setdefault("wait_until", self.config.goto_wait_until)
         page.on("download", _handle_download)
         try:
             response = await page.goto(url=request.url, **page_goto_kwargs)
@@ -499,9 +1186,25 @@ class ScrapyPlaywrightDownloadHandler(HTTPDownloadHandler):
 
         return response, download
 
+    async def _wait_for_selectors(self, page: Page, request: Request) -> None:
+        """Wait for all the selectors in the playwright_wait_for_selectors meta key
+        concurrently, rather than one PageMethod (and load state wait) at a time."""
+        selectors = request.meta.get("playwright_wait_for_selectors") or ()
+        if isinstance(selectors, str):
+            selectors = (selectors,)
+        if selectors:
+            await asyncio.gather(*[page.wait_for_selector(selector) for selector in selectors])
+
+    def _get_load_state(self, request: Request) -> str:
+        """Load state to wait for after each PageMethod, matching the navigation's wait_until."""
+        page_goto_kwargs = request.meta.get("playwright_page_goto_kwargs") or {}
+        wait_until = page_goto_kwargs.get("wait_until") or self.config.goto_wait_until or "load"
+        return _GOTO_WAIT_UNTIL_LOAD_STATE.get(wait_until, "load")
+
     async def _apply_page_methods(self, page: Page, request: Request, spider: Spider) -> None:
         context_name = request.meta.get("playwright_context")
         page_methods = request.meta.get("playwright_page_methods") or ()
+        load_state = self._get_load_state(request)
         if isinstance(page_methods, dict):
             page_methods = page_methods.values()
         for pm in page_methods:
@@ -523,7 +1226,10 @@ class ScrapyPlaywrightDownloadHandler(HTTPDownloadHandler):
                     )
                 else:
                     pm.result = await _maybe_await(method(*pm.args, **pm.kwargs))
-                    await page.wait_for_load_state(timeout=self.config.navigation_timeout)
+                    if getattr(pm, "wait_for_load_state", True):
+                        await page.wait_for_load_state(
+                            state=load_state, timeout=self.config.navigation_timeout
+                        )
             else:
                 logger.warning(
                     "Ignoring %r: expected PageMethod, got %r",
@@ -550,19 +1256,110 @@ class ScrapyPlaywrightDownloadHandler(HTTPDownloadHandler):
         self.stats.inc_value(stats_prefix)
         self.stats.inc_value(f"{stats_prefix}/resource_type/{response.request.resource_type}")
         self.stats.inc_value(f"{stats_prefix}/method/{response.request.method}")
+        with suppress(KeyError, TypeError, ValueError):
+            size = int(response.headers["content-length"])
+            sizes = self._response_sizes.setdefault(response.request.resource_type, [0, 0])
+            sizes[0] += size
+            sizes[1] += 1
+
+    def _increment_blocked_request_stats(self, request: PlaywrightRequest, reason: str) -> None:
+        stats_prefix = "playwright/request_count/blocked"
+        self.stats.inc_value(stats_prefix)
+        self.stats.inc_value(f"{stats_prefix}/resource_type/{request.resource_type}")
+        self.stats.inc_value(f"{stats_prefix}/reason/{reason}")
+        # the size of a blocked response is unknown, estimate it from the average
+        # size of the responses of the same resource type that were not blocked,
+        # or from the configured size for types that are blocked on every page
+        total_size, count = self._response_sizes.get(request.resource_type, (0, 0))
+        if count:
+            self.stats.inc_value(f"{stats_prefix}/estimated_bytes_saved", total_size // count)
+        elif request.resource_type in self._blocked_size_estimates:
+            self.stats.inc_value(
+                f"{stats_prefix}/estimated_bytes_saved",
+                self._blocked_size_estimates[request.resource_type],
+            )
+            self.stats.inc_value(f"{stats_prefix}/configured_size_estimate")
+        else:
+            self.stats.inc_value(f"{stats_prefix}/no_size_estimate")
+
+    async def _maybe_cache_subresource(self, response: PlaywrightResponse) -> None:
+        request = response.request
+        if not self.subresource_cache.is_cacheable(
+            request.resource_type, request.method, response.status
+        ):
+            return
+        # responses served from the cache fire "response" events too
+        if request.url in self.subresource_cache:
+            return
+        # decided from the headers first, to only fetch bodies that will be kept
+        if not self.subresource_cache.will_store(response.headers):
+            return
+        try:
+            body = await response.body()
+        except PlaywrightError:
+            return  # the page was closed, or the body is not available (e.g. redirects)
+        entry = await self.subresource_cache.put(
+            request.url, response.status, response.headers, body
+        )
+        if entry is not None:
+            self.stats.inc_value("playwright/subresource_cache/stored")
+            self.stats.inc_value("playwright/subresource_cache/stored_bytes", entry.size)
+
+    async def _maybe_fulfill_from_cache(
+        self, route: Route, playwright_request: PlaywrightRequest
+    ) -> bool:
+        """Serve a subrequest from the subresource cache. Return whether it was served."""
+        if playwright_request.is_navigation_request() or not self.subresource_cache.is_cacheable(
+            playwright_request.resource_type, playwright_request.method, 200
+        ):
+            return False
+        entry = await self.subresource_cache.get(playwright_request.url)
+        if entry is None:
+            self.stats.inc_value("playwright/subresource_cache/miss")
+            return False
+        await route.fulfill(status=entry.status, headers=entry.headers, body=entry.body)
+        self.stats.inc_value("playwright/subresource_cache/hit")
+        self.stats.inc_value(
+            f"playwright/subresource_cache/hit/resource_type/{playwright_request.resource_type}"
+        )
+        self.stats.inc_value("playwright/subresource_cache/bytes_saved", entry.size)
+        return True
+
+    def _forget_page(self, page: Page) -> None:
+        self._page_route_patterns.pop(page, None)
+        self._page_request_listeners.pop(page, None)
 
-    def _make_close_page_callback(self, context_name: str) -> Callable:
+    def _make_close_page_callback(
+        self, ctx_wrapper: BrowserContextWrapper, page: Page
+    ) -> Callable:
         def close_page_callback() -> None:
-            if context_name in self.context_wrappers:
-                self.context_wrappers[context_name].semaphore.release()
+            ctx_wrapper.page_uses.pop(page, None)
+            with suppress(ValueError):
+                ctx_wrapper.page_pool.remove(page)
+            # idle pages don't hold the semaphore, and "crash" may be followed by "close"
+            if page in ctx_wrapper.pages_in_use:
+                ctx_wrapper.pages_in_use.discard(page)
+                ctx_wrapper.semaphore.release()
+            self._maybe_close_retired_context(ctx_wrapper)
 
         return close_page_callback
 
     def _make_close_browser_context_callback(
-        self, name: str, persistent: bool, remote: bool, spider: Optional[Spider] = None
+        self,
+        name: str,
+        context: BrowserContext,
+        persistent: bool,
+        remote: bool,
+        spider: Optional[Spider] = None,
     ) -> Callable:
         def close_browser_context_callback() -> None:
-            self.context_wrappers.pop(name, None)
+            # a retired context may already have been replaced under the same name
+            ctx_wrapper = self.context_wrappers.get(name)
+            if ctx_wrapper is not None and ctx_wrapper.context is context:
+                del self.context_wrappers[name]
+            self.retiring_context_wrappers = [
+                ctx for ctx in self.retiring_context_wrappers if ctx.context is not context
+            ]
             if hasattr(self, "context_semaphore"):
                 self.context_semaphore.release()
             logger.debug(
@@ -589,9 +1386,32 @@ class ScrapyPlaywrightDownloadHandler(HTTPDownloadHandler):
         body: Optional[bytes],
         encoding: str,
         spider: Spider,
+        block_policy: Optional[BlockPolicy] = None,
     ) -> Callable:
         async def _request_handler(route: Route, playwright_request: PlaywrightRequest) -> None:
             """Override request headers, method and body."""
+            if block_policy is not None:
+                reason = block_policy.block_reason(playwright_request)
+                if reason:
+                    await route.abort()
+                    logger.debug(
+                        "[Context=%s] Blocked Playwright request <%s %s> (reason: %s)",
+                        context_name,
+                        playwright_request.method.upper(),
+                        playwright_request.url,
+                        reason,
+                        extra={
+                            "spider": spider,
+                            "context_name": context_name,
+                            "scrapy_request_url": url,
+                            "scrapy_request_method": method,
+                            "playwright_request_url": playwright_request.url,
+                            "playwright_request_method": playwright_request.method,
+                        },
+                    )
+                    self._increment_blocked_request_stats(playwright_request, reason)
+                    return None
+
             if self.abort_request:
                 should_abort = await _maybe_await(self.abort_request(playwright_request))
                 if should_abort:
@@ -613,6 +1433,15 @@ class ScrapyPlaywrightDownloadHandler(HTTPDownloadHandler):
                     self.stats.inc_value("playwright/request_count/aborted")
                     return None
 
+            if self.subresource_cache is not None:
+                try:
+                    if await self._maybe_fulfill_from_cache(route, playwright_request):
+                        return None
+                except PlaywrightError as ex:
+                    if not _is_safe_close_error(ex):
+                        raise
+                    return None
+
             overrides: dict = {}
 
             if self.process_request_headers is None:
@@ -687,14 +1516,20 @@ class ScrapyPlaywrightDownloadHandler(HTTPDownloadHandler):
 
 def _attach_page_event_handlers(
     page: Page, request: Request, spider: Spider, context_name: str
-) -> None:
+) -> List[Tuple[str, Callable]]:
+    """Attach the handlers from the playwright_page_event_handlers meta key.
+    Return the (event, handler) pairs that were attached."""
+    attached: List[Tuple[str, Callable]] = []
     event_handlers = request.meta.get("playwright_page_event_handlers") or {}
     for event, handler in event_handlers.items():
         if callable(handler):
             page.on(event, handler)
+            attached.append((event, handler))
         elif isinstance(handler, str):
             try:
-                page.on(event, getattr(spider, handler))
+                spider_handler = getattr(spider, handler)
+                page.on(event, spider_handler)
+                attached.append((event, spider_handler))
             except AttributeError as ex:
                 logger.warning(
                     "Spider '%s' does not have a '%s' attribute,"
@@ -711,6 +1546,7 @@ def _attach_page_event_handlers(
                     },
                     exc_info=True,
                 )
+    return attached
 
 
 async def _set_redirect_meta(request: Request, response: PlaywrightResponse) -> None:
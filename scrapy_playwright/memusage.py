@@ -1,15 +1,113 @@
+import csv
+import os
 from contextlib import suppress
 from importlib import import_module
-from typing import List
+from time import time
+from typing import Dict, List, Optional
 
+from scrapy import signals
+from scrapy.crawler import Crawler
 from scrapy.exceptions import NotConfigured
 from scrapy.extensions.memusage import MemoryUsage
+from twisted.internet import task
 
 from scrapy_playwright.handler import ScrapyPlaywrightDownloadHandler, logger
 
 
 _MIB_FACTOR = 1024**2
 
+_COMPONENTS = ("driver", "browser", "content")
+
+
+def _get_playwright_handlers(crawler: Crawler) -> List[ScrapyPlaywrightDownloadHandler]:
+    try:
+        return [
+            handler
+            for handler in crawler.engine.downloader.handlers._handlers.values()
+            if isinstance(handler, ScrapyPlaywrightDownloadHandler)
+        ]
+    except Exception:
+        return []
+
+
+def _get_driver_process_ids(crawler: Crawler) -> List[int]:
+    try:
+        return [
+            handler.playwright_context_manager._connection._transport._proc.pid
+            for handler in _get_playwright_handlers(crawler)
+            if handler.playwright_context_manager
+        ]
+    except Exception:
+        return []
+
+
+def _classify_process(process) -> str:
+    """Tell renderer/content processes apart from the browser's own processes."""
+    try:
+        cmdline = " ".join(process.cmdline())
+        name = process.name()
+    except Exception:
+        return "browser"
+    if "--type=renderer" in cmdline or "-contentproc" in cmdline or "WebContent" in name:
+        return "content"
+    return "browser"
+
+
+class _PlaywrightProcessTree:
+    """Processes started by the Playwright drivers, grouped by component.
+
+    Listing descendant processes goes through every process on the system, so the
+    tree is only listed again every refresh_interval seconds, or when one of the
+    known processes has exited. Between refreshes only memory_info() is read.
+    """
+
+    def __init__(self, psutil, refresh_interval: float = 10) -> None:
+        self.psutil = psutil
+        self.refresh_interval = refresh_interval
+        self.driver_pids: List[int] = []
+        # pid -> (psutil.Process, component)
+        self.processes: Dict[int, tuple] = {}
+        self.last_refresh = 0.0
+
+    def refresh(self, driver_pids: List[int]) -> None:
+        processes = {}
+        for pid in driver_pids:
+            with suppress(Exception):  # might fail if the process exited in the meantime
+                driver = self.psutil.Process(pid)
+                processes[pid] = self.processes.get(pid) or (driver, "driver")
+                for child in driver.children(recursive=True):
+                    processes[child.pid] = self.processes.get(child.pid) or (
+                        child,
+                        _classify_process(child),
+                    )
+        self.driver_pids = list(driver_pids)
+        self.processes = processes
+        self.last_refresh = time()
+
+    def sample(self, driver_pids: List[int]) -> Dict[str, int]:
+        """Return the RSS of each component, in bytes."""
+        if (
+            driver_pids != self.driver_pids
+            or time() - self.last_refresh >= self.refresh_interval
+        ):
+            self.refresh(driver_pids)
+        rss = dict.fromkeys(_COMPONENTS, 0)
+        exited = False
+        for process, component in self.processes.values():
+            try:
+                rss[component] += process.memory_info().rss
+            except Exception:
+                exited = True
+        if exited:
+            self.last_refresh = 0.0  # list the tree again on the next sample
+        return rss
+
+    def process_counts(self) -> Dict[str, int]:
+        counts = dict.fromkeys(_COMPONENTS, 0)
+        for _, component in self.processes.values():
+            counts[component] += 1
+        return counts
+
 
 class ScrapyPlaywrightMemoryUsageExtension(MemoryUsage):
     def __init__(self, *args, **kwargs) -> None:
@@ -18,33 +116,68 @@ class ScrapyPlaywrightMemoryUsageExtension(MemoryUsage):
             self.psutil = import_module("psutil")
         except ImportError as exc:
             raise NotConfigured("The psutil module is not available") from exc
+        self.process_tree = _PlaywrightProcessTree(self.psutil)
+        self.soft_limit = (
+            self.crawler.settings.getint("PLAYWRIGHT_MEMUSAGE_SOFT_LIMIT_MB") * _MIB_FACTOR
+        )
+        self.soft_limit_resume_ratio = self.crawler.settings.getfloat(
+            "PLAYWRIGHT_MEMUSAGE_SOFT_LIMIT_RESUME_RATIO", 0.9
+        )
+
+    def engine_started(self) -> None:
+        super().engine_started()
+        if self.soft_limit:
+            tsk = task.LoopingCall(self._check_soft_limit)
+            self.tasks.append(tsk)
+            tsk.start(self.check_interval, now=True)
+
+    def _check_soft_limit(self) -> None:
+        """Halve the pages per context on every check above the soft limit, and double
+        them back on every check below soft_limit * soft_limit_resume_ratio. Unlike
+        the hard limit, which uses the peak RSS, this looks at the current RSS so
+        that concurrency comes back once memory is freed."""
+        usage = (
+            self.psutil.Process().memory_info().rss + self._get_total_playwright_process_memory()
+        )
+        self.crawler.stats.set_value("memusage/soft_limit/current", usage)
+        for handler in _get_playwright_handlers(self.crawler):
+            current_limit = handler._page_limits.get("memory")
+            if usage > self.soft_limit:
+                new_limit = max(1, (current_limit or handler._get_page_limit()) // 2)
+                if new_limit == current_limit:
+                    continue
+                handler.set_page_limit("memory", new_limit)
+                self.crawler.stats.inc_value("memusage/soft_limit/throttled")
+                self.crawler.stats.set_value("memusage/soft_limit/reached", 1)
+                self.crawler.stats.min_value("memusage/soft_limit/min_page_limit", new_limit)
+                logger.warning(
+                    "Memory usage above the soft limit (%iMiB > %iMiB),"
+                    " lowering pages per context to %i",
+                    usage / _MIB_FACTOR,
+                    self.soft_limit / _MIB_FACTOR,
+                    new_limit,
+                )
+            elif (
+                current_limit is not None
+                and usage < self.soft_limit * self.soft_limit_resume_ratio
+            ):
+                new_limit = current_limit * 2
+                if new_limit >= handler.config.max_pages_per_context:
+                    new_limit = None
+                handler.set_page_limit("memory", new_limit)
+                self.crawler.stats.inc_value("memusage/soft_limit/restored")
+                logger.info(
+                    "Memory usage back below the soft limit (%iMiB),"
+                    " raising pages per context to %i",
+                    usage / _MIB_FACTOR,
+                    handler._get_page_limit(),
+                )
 
     def _get_main_process_ids(self) -> List[int]:
-        try:
-            return [
-                handler.playwright_context_manager._connection._transport._proc.pid
-                for handler in self.crawler.engine.downloader.handlers._handlers.values()
-                if isinstance(handler, ScrapyPlaywrightDownloadHandler)
-                and handler.playwright_context_manager
-            ]
-        except Exception:
-            return []
-
-    def _get_descendant_processes(self, process) -> list:
-        children = process.children()
-        result = children.copy()
-        for child in children:
-            result.extend(self._get_descendant_processes(child))
-        return result
+        return _get_driver_process_ids(self.crawler)
 
     def _get_total_playwright_process_memory(self) -> int:
-        process_list = [self.psutil.Process(pid) for pid in self._get_main_process_ids()]
-        for proc in process_list.copy():
-            process_list.extend(self._get_descendant_processes(proc))
-        total_process_size = 0
-        for proc in process_list:
-            with suppress(Exception):  # might fail if the process exited in the meantime
-                total_process_size += proc.memory_info().rss
+        total_process_size = sum(self.process_tree.sample(self._get_main_process_ids()).values())
         logger.debug(
             "Total Playwright process memory: %i Bytes (%i MiB)",
             total_process_size,
@@ -54,3 +187,91 @@ class ScrapyPlaywrightMemoryUsageExtension(MemoryUsage):
 
     def get_virtual_size(self) -> int:
         return super().get_virtual_size() + self._get_total_playwright_process_memory()
+
+
+class ScrapyPlaywrightMemorySampler:
+    """Records the RSS of the Scrapy process and of the Playwright driver, browser
+    and content processes every PLAYWRIGHT_MEMORY_SAMPLER_INTERVAL seconds.
+
+    The peak, last value and growth of each component are added to the crawl stats
+    under memory_sampler/, and the whole series is written to
+    PLAYWRIGHT_MEMORY_SAMPLER_CSV when the spider closes.
+    """
+
+    def __init__(self, crawler: Crawler) -> None:
+        if not crawler.settings.getbool("PLAYWRIGHT_MEMORY_SAMPLER_ENABLED"):
+            raise NotConfigured
+        try:
+            self.psutil = import_module("psutil")
+        except ImportError as exc:
+            raise NotConfigured("The psutil module is not available") from exc
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.interval = crawler.settings.getfloat("PLAYWRIGHT_MEMORY_SAMPLER_INTERVAL", 5)
+        self.csv_path = crawler.settings.get("PLAYWRIGHT_MEMORY_SAMPLER_CSV")
+        self.process = self.psutil.Process()
+        self.process_tree = _PlaywrightProcessTree(
+            self.psutil,
+            refresh_interval=crawler.settings.getfloat(
+                "PLAYWRIGHT_MEMORY_SAMPLER_TREE_REFRESH_INTERVAL", 10
+            ),
+        )
+        self.samples: List[dict] = []
+        self.start_time = time()
+        self.task: Optional[task.LoopingCall] = None
+        crawler.signals.connect(self.engine_started, signal=signals.engine_started)
+        crawler.signals.connect(self.spider_closed, signal=signals.spider_closed)
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler) -> "ScrapyPlaywrightMemorySampler":
+        return cls(crawler)
+
+    def engine_started(self) -> None:
+        self.start_time = time()
+        self.task = task.LoopingCall(self.take_sample)
+        self.task.start(self.interval, now=True)
+
+    def take_sample(self) -> None:
+        sample = {"elapsed": round(time() - self.start_time, 3), "pid": self.process.pid}
+        with suppress(Exception):
+            sample["scrapy"] = self.process.memory_info().rss
+        sample.update(self.process_tree.sample(_get_driver_process_ids(self.crawler)))
+        sample["total"] = sum(sample.get(name, 0) for name in ("scrapy", *_COMPONENTS))
+        for component, count in self.process_tree.process_counts().items():
+            sample[f"{component}_processes"] = count
+        self.samples.append(sample)
+        self.stats.inc_value("memory_sampler/samples")
+        for name in ("scrapy", *_COMPONENTS, "total"):
+            self.stats.max_value(f"memory_sampler/{name}/max", sample.get(name, 0))
+
+    def spider_closed(self, spider) -> None:
+        if self.task is not None and self.task.running:
+            self.task.stop()
+        if not self.samples:
+            return
+        first, last = self.samples[0], self.samples[-1]
+        for name in ("scrapy", *_COMPONENTS, "total"):
+            self.stats.set_value(f"memory_sampler/{name}/last", last.get(name, 0))
+            self.stats.set_value(
+                f"memory_sampler/{name}/growth", last.get(name, 0) - first.get(name, 0)
+            )
+        if self.csv_path:
+            self.write_csv(self.csv_path)
+
+    def write_csv(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fieldnames = [
+            "elapsed",
+            "pid",
+            "scrapy",
+            *_COMPONENTS,
+            "total",
+            *(f"{component}_processes" for component in _COMPONENTS),
+        ]
+        with open(path, "w", newline="", encoding="utf-8") as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=fieldnames, restval=0)
+            writer.writeheader()
+            writer.writerows(self.samples)
+        logger.info("Wrote %i memory samples to %s", len(self.samples), path)
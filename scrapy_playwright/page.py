@@ -8,12 +8,17 @@ class PageMethod:
     """
     Represents a method to be called (and awaited if necessary) on a
     Playwright page, such as "click", "screenshot", "evaluate", etc.
+
+    By default the handler waits for the page load state after the method
+    returns. Pass wait_for_load_state=False to skip that wait, e.g. for
+    methods that don't trigger a navigation.
     """
 
-    def __init__(self, method: str, *args, **kwargs) -> None:
+    def __init__(self, method: str, *args, wait_for_load_state: bool = True, **kwargs) -> None:
         self.method: str = method
         self.args: tuple = args
         self.kwargs: dict = kwargs
+        self.wait_for_load_state: bool = wait_for_load_state
         self.result: Any = None
 
     def __str__(self) -> str:
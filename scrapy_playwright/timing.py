@@ -0,0 +1,181 @@
+"""
+This module includes per-stage latency histograms, shared by the download handler,
+spiders and pipelines of a crawl. Refer to the LATENCY_HISTOGRAMS_* settings for
+more information.
+"""
+import bisect
+import logging
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from scrapy import signals
+from scrapy.crawler import Crawler
+from scrapy.exceptions import NotConfigured
+
+
+__all__ = [
+    "LatencyHistogram",
+    "LatencyHistograms",
+    "LatencyHistogramsExtension",
+    "get_latency_histograms",
+]
+
+logger = logging.getLogger("scrapy-playwright")
+
+# upper bounds of the histogram buckets, in milliseconds
+BUCKET_BOUNDS_MS: Tuple[float, ...] = (
+    1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 60000, float("inf"),
+)
+
+DEFAULT_REQUEST_KIND = "other"
+
+
+class LatencyHistogram:
+    """Log-spaced histogram of durations, in milliseconds."""
+
+    def __init__(self) -> None:
+        self.counts: List[int] = [0] * len(BUCKET_BOUNDS_MS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bound of the bucket holding the given fraction of observations,
+        capped at the largest one observed."""
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKET_BOUNDS_MS, self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 3) if self.count else 0,
+            "p50_ms": self.percentile(0.5),
+            "p90_ms": self.percentile(0.9),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max, 3),
+        }
+
+    def buckets(self) -> Dict[str, int]:
+        return {
+            f"le_{bound:g}ms": count
+            for bound, count in zip(BUCKET_BOUNDS_MS, self.counts)
+            if count
+        }
+
+
+class LatencyHistograms:
+    """Histograms keyed by request kind (e.g. "search") and stage (e.g. "goto")."""
+
+    def __init__(self) -> None:
+        self.histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+
+    def observe(self, kind: Optional[str], stage: str, seconds: float) -> None:
+        key = (kind or DEFAULT_REQUEST_KIND, stage)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = LatencyHistogram()
+        histogram.observe(seconds)
+
+    @contextmanager
+    def time(self, kind: Optional[str], stage: str) -> Iterator[None]:
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(kind, stage, perf_counter() - start)
+
+    def timed_generator(self, kind: Optional[str], stage: str, generator) -> Iterator:
+        """Iterate over a generator (e.g. a spider callback), timing only the work
+        done inside it and not the time its consumer spends between items."""
+        elapsed = 0.0
+        try:
+            while True:
+                start = perf_counter()
+                try:
+                    value = next(generator)
+                except StopIteration:
+                    elapsed += perf_counter() - start
+                    return
+                elapsed += perf_counter() - start
+                yield value
+        finally:
+            generator.close()
+            self.observe(kind, stage, elapsed)
+
+    def summary(self) -> Dict[str, dict]:
+        """Percentiles of every histogram, keyed by "<kind>/<stage>"."""
+        return {
+            f"{kind}/{stage}": histogram.summary()
+            for (kind, stage), histogram in sorted(self.histograms.items())
+        }
+
+    def table(self) -> str:
+        """Human readable summary, e.g. for the telnet console: print(latency.table())"""
+        lines = [f"{'kind/stage':<36} {'count':>8} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}"]
+        for name, summary in self.summary().items():
+            lines.append(
+                f"{name:<36} {summary['count']:>8} {summary['p50_ms']:>9g}"
+                f" {summary['p90_ms']:>9g} {summary['p99_ms']:>9g} {summary['max_ms']:>9g}"
+            )
+        return "\n".join(lines)
+
+
+def get_latency_histograms(crawler: Optional[Crawler]) -> Optional[LatencyHistograms]:
+    """The histograms of a crawl, or None if LatencyHistogramsExtension is not enabled."""
+    return getattr(crawler, "latency_histograms", None)
+
+
+class LatencyHistogramsExtension:
+    """Makes per-stage latency histograms available to the components of a crawl,
+    as crawler.latency_histograms, and to the telnet console as "latency".
+
+    When the spider closes, the percentiles of each histogram are added to the crawl
+    stats under latency/<kind>/<stage>/, with the full buckets if
+    LATENCY_HISTOGRAMS_DUMP_BUCKETS is enabled.
+    """
+
+    def __init__(self, crawler: Crawler) -> None:
+        if not crawler.settings.getbool("LATENCY_HISTOGRAMS_ENABLED"):
+            raise NotConfigured
+        self.crawler = crawler
+        self.dump_buckets = crawler.settings.getbool("LATENCY_HISTOGRAMS_DUMP_BUCKETS")
+        self.histograms = LatencyHistograms()
+        crawler.latency_histograms = self.histograms
+        crawler.signals.connect(self.spider_closed, signal=signals.spider_closed)
+        try:
+            from scrapy.extensions.telnet import update_telnet_vars
+        except ImportError:
+            pass
+        else:
+            crawler.signals.connect(self.update_telnet_vars, signal=update_telnet_vars)
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler) -> "LatencyHistogramsExtension":
+        return cls(crawler)
+
+    def update_telnet_vars(self, telnet_vars: dict) -> None:
+        telnet_vars["latency"] = self.histograms
+
+    def spider_closed(self, spider) -> None:
+        stats = self.crawler.stats
+        for (kind, stage), histogram in sorted(self.histograms.histograms.items()):
+            prefix = f"latency/{kind}/{stage}"
+            for name, value in histogram.summary().items():
+                stats.set_value(f"{prefix}/{name}", value)
+            if self.dump_buckets:
+                stats.set_value(f"{prefix}/buckets", histogram.buckets())
+        if self.histograms.histograms:
+            logger.info("Latency per stage (ms):\n%s", self.histograms.table())